@@ -0,0 +1,135 @@
+"""
+Request micro-batching for model inference
+Concurrent single-row predictions are stacked into one array so the scaler
+and model are invoked once per batch instead of once per request. A request
+that arrives while the model is idle is dispatched at once; the batching
+window is only waited out while other batches are running.
+"""
+
+import asyncio
+import numpy as np
+from concurrent.futures import BrokenExecutor, Executor
+from typing import Callable, List, Optional, Set, Tuple
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent prediction requests into batched model calls
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], List], max_batch: int = 64, max_wait: float = 0.005,
+                 executor: Optional[Executor] = None, executor_factory: Optional[Callable[[], Executor]] = None):
+        """
+        Args:
+            predict_fn: Function mapping a (B, n_features) array to B results
+            max_batch: Maximum number of rows per batch
+            max_wait: Seconds to wait for more rows while another batch is in flight
+            executor: Executor that runs predict_fn off the event loop (default thread pool if None)
+            executor_factory: Creates the executor (if none is given) and replaces it when it breaks,
+                e.g. a process pool whose worker died; the failed batch is then retried once
+        """
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor_factory = executor_factory
+        if executor is None and executor_factory is not None:
+            executor = executor_factory()
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background batching task and any batches still running"""
+        tasks = list(self._inflight)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def predict(self, features: np.ndarray):
+        """
+        Queue one feature row and wait for its prediction
+        Args:
+            features: 1-D feature array for a single sample
+        Returns:
+            The result produced by predict_fn for this row
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        """Wait for one request and take any already queued; wait for more only while other batches run"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        
+        # Nothing else is running, so waiting for company would only add latency
+        if not self._inflight:
+            return batch
+        
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Background loop: collect batches and hand each one to the executor"""
+        while True:
+            batch = await self._collect_batch()
+            # Keep collecting while this batch runs so several can be in flight at once
+            task = asyncio.create_task(self._predict_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _predict_batch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Predict one batch in the executor and resolve every waiter"""
+        futures = [future for _, future in batch]
+        features = np.stack([features for features, _ in batch])
+
+        try:
+            results = await self._run_in_executor(features)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_in_executor(self, features: np.ndarray):
+        """Run predict_fn in the executor, replacing a broken executor and retrying once"""
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, self.predict_fn, features)
+        except BrokenExecutor:
+            if self.executor_factory is None:
+                raise
+        
+        # Every batch in flight fails together when a pool breaks; only the first to
+        # get here replaces it, the rest retry on the new executor
+        if self.executor is executor:
+            executor.shutdown(wait=False)
+            self.executor = self.executor_factory()
+        return await loop.run_in_executor(self.executor, self.predict_fn, features)
@@ -0,0 +1,14 @@
+"""
+Compile the XGBoost model to the native library used by main.py
+Run once per deployment before starting the API workers, and again after
+replacing the model pickle. The API only uses a library newer than the
+pickle, and otherwise predicts with the XGBoost model.
+"""
+
+import joblib
+from config import MODEL_PATH, MODEL_LIB_PATH
+from utils import compile_model_library
+
+if __name__ == "__main__":
+    libpath = compile_model_library(joblib.load(MODEL_PATH), MODEL_PATH, MODEL_LIB_PATH)
+    print(f"Model library: {libpath}" if libpath else "Model library not built (Treelite unavailable or compilation failed)")
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Paths of the trained model artifacts, shared by main.py and build_model_library.py
+"""
+
+SCALER_PATH = 'scaler.pkl'
+LABEL_ENCODER_PATH = 'label_encoder.pkl'
+MODEL_PATH = 'xgb_model.pkl'
+MODEL_LIB_PATH = './xgb.so'
\ No newline at end of file
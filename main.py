@@ -1,85 +1,152 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import inspect
 import joblib
+import multiprocessing
+import os
 import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List
-from schemas import RiskPredictionResponse, PatientQueueResponse, VitalSigns as SchemaVitalSigns
-from utils import create_risk_assessment_with_priority, manage_patient_queue
-from models import RiskAssessment, PatientQueue
-
-app = FastAPI()
+from typing import List, Tuple
+from schemas import RiskPredictionResponse, PatientQueueResponse, VitalSigns
+from utils import (
+    build_risk_assessment, is_model_library_current, init_prediction_worker, predict_batch_in_worker,
+    quantized_vitals_key, vital_signs_features,
+    rank_patient_queue, calculate_estimated_wait_time, get_priority_manager
+)
+from models import PatientQueue, VitalSigns as ModelVitalSigns, RISK_LOW, RISK_MEDIUM, RISK_HIGH
+from batching import PredictionBatcher
+from queue_store import QueueStore
+from redis_queue_store import RedisQueueStore
+from config import SCALER_PATH, LABEL_ENCODER_PATH, MODEL_PATH, MODEL_LIB_PATH
 
 # Load models and encoders
-scaler = joblib.load('scaler.pkl')
-label_encoder = joblib.load('label_encoder.pkl')
-xgb = joblib.load('xgb_model.pkl')
-
-# In-memory storage for patient queue (in production, use a database)
-patient_assessments: List[RiskAssessment] = []
-
-# Define input schema
-class VitalSigns(BaseModel):
-    Heart_Rate: float
-    Respiratory_Rate: float
-    Body_Temperature: float
-    Oxygen_Saturation: float
-    Systolic_Blood_Pressure: float
-    Diastolic_Blood_Pressure: float
-    Age: float
-    Gender: int
-    Weight_kg: float
-    Height_m: float
-    Derived_HRV: float
-    Derived_Pulse_Pressure: float
-    Derived_BMI: float
-    Derived_MAP: float
+scaler = joblib.load(SCALER_PATH)
+label_encoder = joblib.load(LABEL_ENCODER_PATH)
+xgb = joblib.load(MODEL_PATH)
+
+# Native compiled tree ensemble, built ahead of time by build_model_library.py (every API
+# worker imports this module, so it is not compiled here); None falls back to the XGBoost model
+model_lib_path = MODEL_LIB_PATH if is_model_library_current(MODEL_PATH, MODEL_LIB_PATH) else None
+
+# Model inference runs in worker processes so batches predict in parallel, outside the GIL.
+# Every API process starts its own pool, so by default the cores are split between the
+# WEB_CONCURRENCY API workers (Gunicorn's worker count); INFERENCE_WORKERS overrides it
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0)) or max(
+    1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", 1))
+)
+
+def _create_inference_pool() -> ProcessPoolExecutor:
+    """Start the inference process pool (called again if a worker process dies)"""
+    return ProcessPoolExecutor(
+        max_workers=INFERENCE_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_prediction_worker,
+        initargs=(SCALER_PATH, MODEL_PATH, LABEL_ENCODER_PATH, model_lib_path)
+    )
+
+# Concurrent /predict/ calls arriving within MAX_WAIT seconds share one model call
+MAX_BATCH = 64
+MAX_WAIT = 0.005
+
+prediction_batcher = PredictionBatcher(
+    predict_batch_in_worker,
+    max_batch=MAX_BATCH,
+    max_wait=MAX_WAIT,
+    executor_factory=_create_inference_pool
+)
+
+# LRU cache of (risk_level, confidence_score) keyed on coarsened vitals, so monitors
+# re-submitting near-identical readings skip the model (clear it if the model is reloaded)
+PREDICTION_CACHE_SIZE = 4096
+_prediction_cache: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
+
+async def _predict_cached(vital_signs: ModelVitalSigns) -> Tuple[str, float]:
+    """Predict risk for vital signs, reusing the result for near-identical readings"""
+    key = quantized_vitals_key(vital_signs)
+    prediction = _prediction_cache.get(key)
+    if prediction is not None:
+        _prediction_cache.move_to_end(key)
+        return prediction
+    
+    # Prediction is batched with concurrent requests
+    prediction = await prediction_batcher.predict(vital_signs_features(vital_signs))
+    _prediction_cache[key] = prediction
+    if len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+        _prediction_cache.popitem(last=False)
+    return prediction
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prediction_batcher.start()
+    yield
+    await prediction_batcher.stop()
+    prediction_batcher.executor.shutdown()
+    if isinstance(patient_queue, RedisQueueStore):
+        await patient_queue.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Priority queue: shared through Redis when REDIS_URL is set (required to run
+# several API workers), otherwise kept in this process's memory
+REDIS_URL = os.environ.get("REDIS_URL")
+patient_queue = RedisQueueStore(REDIS_URL) if REDIS_URL else QueueStore()
+
+# Serializes access to the queue across concurrent requests in this process
+_queue_lock = asyncio.Lock()
+
+# One RL priority manager for the app (shared with queue ranking), so feedback
+# accumulates in its history and Q-table
+priority_manager = get_priority_manager()
+_feedback_lock = asyncio.Lock()
+
+async def _queue_call(method, *args, offload: bool = False):
+    """
+    Call a patient queue method on either backend
+    Args:
+        method: Bound QueueStore (synchronous) or RedisQueueStore (async) method
+        *args: Arguments for the method
+        offload: Run a synchronous method in a worker thread (for whole-queue work)
+    Returns:
+        The method's result
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(*args)
+    if offload:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the Health Risk Predictor FastAPI app with Priority Scheduling!"}
 
 @app.post("/predict/", response_model=RiskPredictionResponse)
-def predict_risk_with_priority(vitals: VitalSigns):
+async def predict_risk_with_priority(vitals: VitalSigns):
     """Predict risk with confidence score and priority calculation"""
     
-    # Convert input to the format expected by utils
-    vital_signs_data = {
-        "heart_rate": int(vitals.Heart_Rate),
-        "respiratory_rate": int(vitals.Respiratory_Rate),
-        "body_temperature": vitals.Body_Temperature,
-        "oxygen_saturation": int(vitals.Oxygen_Saturation),
-        "systolic_blood_pressure": int(vitals.Systolic_Blood_Pressure),
-        "diastolic_blood_pressure": int(vitals.Diastolic_Blood_Pressure),
-        "age": int(vitals.Age),
-        "gender": vitals.Gender,
-        "weight": vitals.Weight_kg,
-        "height": vitals.Height_m,
-        "derived_hrv": vitals.Derived_HRV,
-        "derived_pulse_pressure": vitals.Derived_Pulse_Pressure,
-        "derived_bmi": vitals.Derived_BMI,
-        "derived_map": vitals.Derived_MAP
-    }
+    # Internal dataclass with the same fields as the request model
+    vital_signs = ModelVitalSigns(**vitals.__dict__)
     
     # Create risk assessment with priority
-    risk_assessment = create_risk_assessment_with_priority(
-        vital_signs_data, scaler, xgb, label_encoder
-    )
+    risk_level, confidence_score = await _predict_cached(vital_signs)
+    risk_assessment = build_risk_assessment(vital_signs, risk_level, confidence_score)
     
-    # Add to patient assessments for queue management
-    patient_assessments.append(risk_assessment)
-    
-    # Calculate estimated wait time based on current queue
-    current_queue = manage_patient_queue(patient_assessments)
-    
-    # Find this patient's position in queue (last added)
-    estimated_wait_time = 0
-    if current_queue:
-        # Find the patient with matching timestamp (more reliable than vital signs)
-        for patient in current_queue:
-            if abs((patient.risk_assessment.timestamp - risk_assessment.timestamp).total_seconds()) < 1:
-                estimated_wait_time = patient.estimated_wait_time
-                break
+    async with _queue_lock:
+        # Add to the priority queue
+        patient_number = await _queue_call(patient_queue.next_patient_number)
+        queue_item = PatientQueue(
+            patient_id=f"patient_{patient_number}_{int(risk_assessment.timestamp.timestamp())}",
+            risk_assessment=risk_assessment
+        )
+        
+        # Wait time only depends on how many queued patients outrank this one
+        position = await _queue_call(patient_queue.position_for, queue_item.get_final_priority())
+        await _queue_call(patient_queue.push, queue_item)
+        queue_item.queue_position = position + 1
+        queue_item.estimated_wait_time = calculate_estimated_wait_time(queue_item, position)
+        estimated_wait_time = queue_item.estimated_wait_time
     
     return RiskPredictionResponse(
         risk_level=risk_assessment.risk_level,
@@ -87,76 +154,79 @@ def predict_risk_with_priority(vitals: VitalSigns):
         priority_score=risk_assessment.priority_score,
         estimated_wait_time=estimated_wait_time,
         timestamp=risk_assessment.timestamp,
-        details=SchemaVitalSigns(
-            heart_rate=risk_assessment.vital_signs.heart_rate,
-            respiratory_rate=risk_assessment.vital_signs.respiratory_rate,
-            body_temperature=risk_assessment.vital_signs.body_temperature,
-            oxygen_saturation=risk_assessment.vital_signs.oxygen_saturation,
-            systolic_blood_pressure=risk_assessment.vital_signs.systolic_blood_pressure,
-            diastolic_blood_pressure=risk_assessment.vital_signs.diastolic_blood_pressure,
-            age=risk_assessment.vital_signs.age,
-            gender=risk_assessment.vital_signs.gender,
-            weight=risk_assessment.vital_signs.weight,
-            height=risk_assessment.vital_signs.height,
-            derived_hrv=risk_assessment.vital_signs.derived_hrv,
-            derived_pulse_pressure=risk_assessment.vital_signs.derived_pulse_pressure,
-            derived_bmi=risk_assessment.vital_signs.derived_bmi,
-            derived_map=risk_assessment.vital_signs.derived_map
-        )
+        details=vitals
     )
 
-@app.get("/queue/", response_model=List[PatientQueueResponse])
-def get_patient_queue():
-    """Get current patient queue sorted by priority"""
-    
-    if not patient_assessments:
-        return []
+def _snapshot_queue(patients: List[PatientQueue]) -> List[dict]:
+    """Rank the queued patients and serialize them (fields as in PatientQueueResponse)"""
+    current_queue = rank_patient_queue(patients)
     
-    current_queue = manage_patient_queue(patient_assessments)
+    # Score the whole queue in one vectorized pass over the store's columns (after the
+    # RL step has set this round's adjustments); the Redis store has no columns
+    if isinstance(patient_queue, QueueStore):
+        priorities = patient_queue.priority_by_patient()
+        priority_scores = [priorities[patient.patient_id] for patient in current_queue]
+    else:
+        priority_scores = [patient.get_final_priority() for patient in current_queue]
     
+    # Built as plain dicts; FastAPI validates and serializes them through the response model
     return [
-        PatientQueueResponse(
-            patient_id=patient.patient_id,
-            risk_level=patient.risk_assessment.risk_level,
-            confidence_score=patient.risk_assessment.confidence_score,
-            priority_score=patient.get_final_priority(),
-            queue_position=patient.queue_position,
-            estimated_wait_time=patient.estimated_wait_time,
-            timestamp=patient.risk_assessment.timestamp
-        )
-        for patient in current_queue
+        {
+            "patient_id": patient.patient_id,
+            "risk_level": patient.risk_assessment.risk_level,
+            "confidence_score": patient.risk_assessment.confidence_score,
+            "priority_score": priority_score,
+            "queue_position": patient.queue_position,
+            "estimated_wait_time": patient.estimated_wait_time,
+            "timestamp": patient.risk_assessment.timestamp
+        }
+        for patient, priority_score in zip(current_queue, priority_scores)
     ]
 
+@app.get("/queue/", response_model=List[PatientQueueResponse])
+async def get_patient_queue():
+    """Get current patient queue sorted by priority"""
+    
+    async with _queue_lock:
+        patients = await _queue_call(patient_queue.patients)
+        if not patients:
+            return []
+        
+        snapshot = await asyncio.to_thread(_snapshot_queue, patients)
+        # Keep this round's RL adjustments for ordering pops (a no-op in memory)
+        await _queue_call(patient_queue.store_rl_adjustments, patients)
+        return snapshot
+
 @app.post("/queue/update-priorities/")
-def update_queue_priorities():
+async def update_queue_priorities():
     """Update priorities for all patients in queue (accounts for time factor)"""
     
-    if not patient_assessments:
-        return {"message": "No patients in queue"}
-    
-    # Update time factors and recalculate priorities
-    for assessment in patient_assessments:
-        assessment.calculate_priority_score()
-    
-    updated_queue = manage_patient_queue(patient_assessments)
+    async with _queue_lock:
+        patient_count = await _queue_call(patient_queue.size)
+        if not patient_count:
+            return {"message": "No patients in queue"}
+        
+        # Update time factors and recalculate priorities
+        await _queue_call(patient_queue.update_priorities, offload=True)
+        risk_counts = await _queue_call(patient_queue.risk_counts)
     
     return {
-        "message": f"Updated priorities for {len(updated_queue)} patients",
-        "high_priority_count": len([p for p in updated_queue if p.risk_assessment.risk_level.lower() == "high"]),
-        "medium_priority_count": len([p for p in updated_queue if p.risk_assessment.risk_level.lower() == "medium"]),
-        "low_priority_count": len([p for p in updated_queue if p.risk_assessment.risk_level.lower() == "low"])
+        "message": f"Updated priorities for {patient_count} patients",
+        "high_priority_count": int(risk_counts[RISK_HIGH]),
+        "medium_priority_count": int(risk_counts[RISK_MEDIUM]),
+        "low_priority_count": int(risk_counts[RISK_LOW])
     }
 
 @app.delete("/queue/clear/")
-def clear_queue():
+async def clear_queue():
     """Clear the patient queue"""
-    global patient_assessments
-    patient_count = len(patient_assessments)
-    patient_assessments = []
+    async with _queue_lock:
+        patient_count = await _queue_call(patient_queue.size)
+        await _queue_call(patient_queue.clear)
     return {"message": f"Cleared {patient_count} patients from queue"}
 
 @app.post("/feedback/")
-def provide_feedback(patient_id: str, actual_wait_time: int, satisfaction_score: float, resource_utilization: float = 0.5):
+async def provide_feedback(patient_id: str, actual_wait_time: int, satisfaction_score: float, resource_utilization: float = 0.5):
     """
     Provide feedback to the RL system for learning
     Args:
@@ -165,8 +235,6 @@ def provide_feedback(patient_id: str, actual_wait_time: int, satisfaction_score:
         satisfaction_score: Patient satisfaction (0.0 to 1.0)
         resource_utilization: Resource utilization efficiency (0.0 to 1.0)
     """
-    from rl_scheduler import PriorityManager
-    
     outcome = {
         'actual_wait_time': actual_wait_time,
         'satisfaction_score': satisfaction_score,
@@ -174,8 +242,9 @@ def provide_feedback(patient_id: str, actual_wait_time: int, satisfaction_score:
         'timestamp': datetime.now()
     }
     
-    priority_manager = PriorityManager()
-    priority_manager.update_with_outcome(patient_id, outcome)
+    # Updates mutate the shared Q-table and history, so apply them one at a time
+    async with _feedback_lock:
+        await asyncio.to_thread(priority_manager.update_with_outcome, patient_id, outcome)
     
     return {
         "message": "Feedback received and RL system updated",
@@ -184,28 +253,24 @@ def provide_feedback(patient_id: str, actual_wait_time: int, satisfaction_score:
     }
 
 @app.get("/queue/next/", response_model=PatientQueueResponse)
-def get_next_patient():
+async def get_next_patient():
     """Get the next patient to be seen (highest priority)"""
     
-    if not patient_assessments:
-        # Return a proper error response that matches the response model
-        raise HTTPException(status_code=404, detail="No patients in queue")
+    async with _queue_lock:
+        patients = await _queue_call(patient_queue.patients)
+        if not patients:
+            # Return a proper error response that matches the response model
+            raise HTTPException(status_code=404, detail="No patients in queue")
+        
+        # Run this round's RL step and pick the top patient without sorting the queue
+        next_patient = await asyncio.to_thread(priority_manager.get_next_patient, patients)
+        
+        # Remove the patient from queue (they're being seen)
+        if not next_patient or not await _queue_call(patient_queue.remove, next_patient.patient_id):
+            raise HTTPException(status_code=404, detail="No patients available")
+        await _queue_call(patient_queue.store_rl_adjustments, patients)
     
-    from rl_scheduler import PriorityManager
-    
-    current_queue = manage_patient_queue(patient_assessments)
-    priority_manager = PriorityManager()
-    
-    next_patient = priority_manager.get_next_patient(current_queue)
-    
-    if not next_patient:
-        raise HTTPException(status_code=404, detail="No patients available")
-    
-    # Remove the patient from queue (they're being seen)
-    patient_assessments[:] = [
-        assessment for assessment in patient_assessments 
-        if assessment.timestamp != next_patient.risk_assessment.timestamp
-    ]
+    next_patient.estimated_wait_time = calculate_estimated_wait_time(next_patient, 0)
     
     return PatientQueueResponse(
         patient_id=next_patient.patient_id,
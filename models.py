@@ -1,16 +1,19 @@
-from pydantic import BaseModel
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 import math
+import sys
+import time
 
-class VitalSigns(BaseModel):
-    heart_rate: int
-    respiratory_rate: int
+@dataclass(slots=True)
+class VitalSigns:
+    heart_rate: float
+    respiratory_rate: float
     body_temperature: float
-    oxygen_saturation: int
-    systolic_blood_pressure: int
-    diastolic_blood_pressure: int
-    age: int
+    oxygen_saturation: float
+    systolic_blood_pressure: float
+    diastolic_blood_pressure: float
+    age: float
     gender: int
     weight: float
     height: float
@@ -19,97 +22,139 @@ class VitalSigns(BaseModel):
     derived_bmi: float
     derived_map: float
 
-class RiskAssessment(BaseModel):
+def critical_vitals_factor(heart_rate, systolic_blood_pressure, oxygen_saturation, body_temperature, respiratory_rate):
+    """
+    Calculate additional priority based on critical vital signs
+    Branch-free: each range check adds its weight times a bool.
+    Returns:
+        float: Critical factor in [0, 1]
+    """
+    critical_factor = (
+        # Critical heart rate (bradycardia < 50, tachycardia > 120)
+        0.3 * ((heart_rate < 50) | (heart_rate > 120))
+        # Critical blood pressure (hypotension < 90, hypertension > 180)
+        + 0.4 * ((systolic_blood_pressure < 90) | (systolic_blood_pressure > 180))
+        # Critical oxygen saturation (< 90%)
+        + 0.5 * (oxygen_saturation < 90)
+        # Critical temperature (hypothermia < 35°C, hyperthermia > 39°C)
+        + 0.3 * ((body_temperature < 35.0) | (body_temperature > 39.0))
+        # Critical respiratory rate (< 12 or > 25)
+        + 0.2 * ((respiratory_rate < 12) | (respiratory_rate > 25))
+    )
+    
+    return min(critical_factor, 1.0)  # Cap at 1.0
+
+# Indices into the per-risk-level lookup tables below. Labels other than
+# low/medium/high map to RISK_OTHER, which scores like low risk but does
+# not receive low-risk RL scheduling.
+RISK_LOW, RISK_MEDIUM, RISK_HIGH, RISK_OTHER = 0, 1, 2, 3
+RISK_LEVEL_INDEX = {"low": RISK_LOW, "medium": RISK_MEDIUM, "high": RISK_HIGH}
+
+# Base risk scores
+BASE_SCORES = (10.0, 50.0, 100.0, 10.0)
+
+# Minutes for time urgency to grow by 1.0: high every 10 minutes, medium
+# every 30 minutes, low (slow increase but with RL scheduling) every 2 hours
+TIME_DIVISORS = (120.0, 30.0, 10.0, 120.0)
+
+@dataclass(slots=True)
+class RiskAssessment:
     risk_level: str
     vital_signs: VitalSigns
     confidence_score: float = 0.0
     priority_score: float = 0.0
-    timestamp: Optional[datetime] = None
+    timestamp: datetime = field(default_factory=datetime.now)
     time_factor: float = 1.0
     
-    def calculate_priority_score(self) -> float:
-        """Calculate priority score based on confidence, risk level, and time factor"""
-        # Base risk scores
-        risk_weights = {
-            "high": 100.0,
-            "medium": 50.0,
-            "low": 10.0
-        }
+    # Monotonic clock reading matching timestamp, used for elapsed-time arithmetic
+    _enqueue_ns: int = field(default=0, init=False, repr=False)
+    
+    # Lower-cased, interned risk_level, computed once instead of lower-casing per call
+    risk_level_lc: str = field(default="", init=False, repr=False)
+    
+    # Lookup table index for risk_level
+    _risk_idx: int = field(default=RISK_OTHER, init=False, repr=False)
+    
+    # Time-independent parts of the priority score (see refresh_cached_priority())
+    _base_priority_cached: float = field(default=0.0, init=False, repr=False)
+    _critical_factor_cached: float = field(default=0.0, init=False, repr=False)
+    
+    def __post_init__(self):
+        # Back-date the monotonic reading for assessments created with an earlier timestamp
+        age_ns = int((datetime.now() - self.timestamp).total_seconds() * 1e9)
+        self._enqueue_ns = time.monotonic_ns() - age_ns
+        self.refresh_cached_priority()
+    
+    def refresh_cached_priority(self):
+        """Recompute the cached values; call after reassigning risk_level, confidence_score or vital_signs"""
+        self.risk_level_lc = sys.intern(self.risk_level.lower())
+        self._risk_idx = RISK_LEVEL_INDEX.get(self.risk_level_lc, RISK_OTHER)
         
-        base_score = risk_weights.get(self.risk_level.lower(), 10.0)
+        vs = self.vital_signs
+        self._critical_factor_cached = critical_vitals_factor(
+            vs.heart_rate,
+            vs.systolic_blood_pressure,
+            vs.oxygen_saturation,
+            vs.body_temperature,
+            vs.respiratory_rate
+        )
+        
+        base_score = BASE_SCORES[self._risk_idx]
         
         # Apply confidence factor (higher confidence = higher priority)
         confidence_factor = self.confidence_score
         
-        # Calculate time factor (urgency increases over time)
-        time_urgency = self._calculate_time_urgency()
-        
         # Age factor (elderly patients get higher priority)
-        age_factor = min(self.vital_signs.age / 80.0, 1.5)
+        age_factor = min(vs.age / 80.0, 1.5)
         
-        # Critical vital signs factor
-        critical_factor = self._calculate_critical_vitals_factor()
+        self._base_priority_cached = (base_score * confidence_factor *
+                                      (1 + age_factor) * (1 + self._critical_factor_cached))
+    
+    @property
+    def risk_index(self) -> int:
+        """Index of risk_level into the per-risk-level lookup tables"""
+        return self._risk_idx
+    
+    @property
+    def base_priority(self) -> float:
+        """Time-independent part of the priority score (multiplied by time urgency)"""
+        return self._base_priority_cached
+    
+    @property
+    def enqueue_ns(self) -> int:
+        """Monotonic clock reading (ns) corresponding to timestamp"""
+        return self._enqueue_ns
+    
+    def calculate_priority_score(self) -> float:
+        """Calculate priority score based on confidence, risk level, and time factor"""
+        # Calculate time factor (urgency increases over time)
+        time_urgency = self._calculate_time_urgency()
         
         # Final priority score calculation
-        priority = (base_score * confidence_factor * time_urgency * 
-                   (1 + age_factor) * (1 + critical_factor))
+        priority = self._base_priority_cached * time_urgency
         
         self.priority_score = priority
         return priority
     
     def _calculate_time_urgency(self) -> float:
         """Calculate urgency based on time elapsed since assessment"""
-        if not self.timestamp:
-            self.timestamp = datetime.now()
-            return 1.0
-        
-        time_elapsed = (datetime.now() - self.timestamp).total_seconds() / 60.0  # minutes
+        time_elapsed = (time.monotonic_ns() - self._enqueue_ns) * 1.6666666666666667e-11  # ns -> minutes
         
-        if self.risk_level.lower() == "high":
-            # High risk patients: exponential urgency increase
-            return 1.0 + (time_elapsed / 10.0)  # Increases every 10 minutes
-        elif self.risk_level.lower() == "medium":
-            # Medium risk: moderate increase
-            return 1.0 + (time_elapsed / 30.0)  # Increases every 30 minutes
-        else:
-            # Low risk: slow increase but with RL scheduling
-            return 1.0 + (time_elapsed / 120.0)  # Increases every 2 hours
+        return 1.0 + (time_elapsed / TIME_DIVISORS[self._risk_idx])
     
     def _calculate_critical_vitals_factor(self) -> float:
         """Calculate additional priority based on critical vital signs"""
-        vs = self.vital_signs
-        critical_factor = 0.0
-        
-        # Critical heart rate (bradycardia < 50, tachycardia > 120)
-        if vs.heart_rate < 50 or vs.heart_rate > 120:
-            critical_factor += 0.3
-        
-        # Critical blood pressure (hypotension < 90, hypertension > 180)
-        if vs.systolic_blood_pressure < 90 or vs.systolic_blood_pressure > 180:
-            critical_factor += 0.4
-        
-        # Critical oxygen saturation (< 90%)
-        if vs.oxygen_saturation < 90:
-            critical_factor += 0.5
-        
-        # Critical temperature (hypothermia < 35°C, hyperthermia > 39°C)
-        if vs.body_temperature < 35.0 or vs.body_temperature > 39.0:
-            critical_factor += 0.3
-        
-        # Critical respiratory rate (< 12 or > 25)
-        if vs.respiratory_rate < 12 or vs.respiratory_rate > 25:
-            critical_factor += 0.2
-        
-        return min(critical_factor, 1.0)  # Cap at 1.0
+        return self._critical_factor_cached
 
-class PatientQueue(BaseModel):
+@dataclass(slots=True)
+class PatientQueue:
     """Model for managing patient queue with RL-based scheduling"""
     patient_id: str
     risk_assessment: RiskAssessment
     queue_position: int = 0
     estimated_wait_time: int = 0  # minutes
     rl_adjustment: float = 0.0  # RL-based priority adjustment for low-risk patients
-    rl_state: Optional[str] = None  # RL state for learning
+    rl_state: Optional[Tuple] = None  # RL state for learning
     rl_action: Optional[str] = None  # RL action taken
     
     def get_final_priority(self) -> float:
@@ -117,7 +162,7 @@ class PatientQueue(BaseModel):
         base_priority = self.risk_assessment.calculate_priority_score()
         
         # Apply RL adjustment for low-risk patients
-        if self.risk_assessment.risk_level.lower() == "low":
+        if self.risk_assessment.risk_index == RISK_LOW:
             # RL can boost or reduce priority based on learned policy
             rl_boost = self.rl_adjustment
             return base_priority + rl_boost
@@ -0,0 +1,190 @@
+"""
+In-memory patient queue storage
+Waiting patients are kept as struct-of-arrays copies of the inputs to the
+priority score, so the whole queue is scored with one vectorized pass
+instead of a Python call per patient. Only the time-dependent part is
+recomputed: each patient's time-independent base priority is stored as
+computed by RiskAssessment, so the columns produce exactly the scalar score
+and take 17 bytes per patient. There is no stored ordering: time urgency
+grows at a different rate per risk level, so priorities cross over time
+and pop() takes the maximum of a fresh pass.
+"""
+
+import itertools
+import time
+import numpy as np
+from typing import Dict, List, Optional
+from models import PatientQueue, BASE_SCORES, TIME_DIVISORS, RISK_LOW
+
+try:
+    import numba
+except ImportError:  # Priorities fall back to the NumPy expression
+    numba = None
+
+_TIME_DIVISORS = np.array(TIME_DIVISORS)
+
+_compute_priorities = None
+if numba is not None:
+    # TBB's worker pool can hang interpreter shutdown next to the process pool
+    numba.config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _compute_priorities(base_priority, risk_idx, enqueue_ns, rl_adjustment, now_ns, out):
+        """Fused single pass of QueueStore.priorities() with no temporary arrays"""
+        for i in numba.prange(base_priority.shape[0]):
+            r = risk_idx[i]
+            time_elapsed = (now_ns - enqueue_ns[i]) * 1.6666666666666667e-11  # ns -> minutes
+            time_urgency = 1.0 + time_elapsed / _TIME_DIVISORS[r]
+            
+            priority = base_priority[i] * time_urgency
+            if r == RISK_LOW:
+                priority += rl_adjustment[i]
+            out[i] = priority
+
+# Columnar priority inputs: column name -> dtype
+_COLUMNS = {
+    'base_priority': np.float64,
+    'risk_idx': np.int8,
+    'enqueue_ns': np.int64,
+}
+
+class QueueStore:
+    """
+    Priority queue of waiting patients with columnar priority inputs
+    Low-risk patients are ordered with the rl_adjustment they currently hold,
+    i.e. as set by the last RL scheduling pass over the queue.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: Initial number of slots in each column (grows on demand)
+        """
+        self._queued: Dict[str, PatientQueue] = {}  # patient_id -> patient, in arrival order
+        self._patient_numbers = itertools.count(1)
+
+        # Slot i of every column holds the inputs of _slot_patients[i]
+        self._slot_patients: List[PatientQueue] = []
+        self._slots: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in _COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def size(self) -> int:
+        """Number of patients waiting"""
+        return len(self._queued)
+
+    def next_patient_number(self) -> int:
+        """Next patient number (not reset by clear())"""
+        return next(self._patient_numbers)
+
+    def patients(self) -> List[PatientQueue]:
+        """Patients currently waiting, in arrival order"""
+        return list(self._queued.values())
+
+    def push(self, patient: PatientQueue):
+        """Add a patient (pushing a queued patient again is a no-op)"""
+        if patient.patient_id not in self._slots:
+            self._add_slot(patient)
+            self._queued[patient.patient_id] = patient
+
+    def pop(self) -> Optional[PatientQueue]:
+        """Remove and return the highest priority patient as of now"""
+        if not self._slot_patients:
+            return None
+        return self.remove(self._slot_patients[int(np.argmax(self.priorities()))].patient_id)
+
+    def remove(self, patient_id: str) -> Optional[PatientQueue]:
+        """Remove and return a queued patient, None if not queued"""
+        patient = self._queued.pop(patient_id, None)
+        if patient is not None:
+            self._free_slot(patient_id)
+        return patient
+
+    def store_rl_adjustments(self, patients: List[PatientQueue]):
+        """RL results are set on the queued PatientQueue objects themselves; nothing to write back"""
+
+    def clear(self):
+        """Remove every patient"""
+        self._queued.clear()
+        self._slot_patients.clear()
+        self._slots.clear()
+
+    def priorities(self) -> np.ndarray:
+        """
+        Final priority of every slot, computed in one pass over the columns
+        Returns:
+            np.ndarray: Priority per slot, matching RiskAssessment.calculate_priority_score
+            plus the RL adjustment for low-risk patients
+        """
+        n = len(self._slot_patients)
+        c = {name: column[:n] for name, column in self._columns.items()}
+        risk_idx = c['risk_idx']
+        rl_adjustment = np.fromiter((p.rl_adjustment for p in self._slot_patients), dtype=np.float64, count=n)
+
+        if _compute_priorities is not None:
+            priorities = np.empty(n)
+            _compute_priorities(
+                c['base_priority'], risk_idx, c['enqueue_ns'], rl_adjustment, time.monotonic_ns(), priorities
+            )
+            return priorities
+
+        time_elapsed = (time.monotonic_ns() - c['enqueue_ns']) * 1.6666666666666667e-11  # ns -> minutes
+        time_urgency = 1.0 + time_elapsed / _TIME_DIVISORS[risk_idx]
+        priority = c['base_priority'] * time_urgency
+
+        return priority + np.where(risk_idx == RISK_LOW, rl_adjustment, 0.0)
+
+    def priority_by_patient(self) -> Dict[str, float]:
+        """Final priority of every queued patient keyed by patient_id, from one priorities() pass"""
+        return dict(zip((p.patient_id for p in self._slot_patients), self.priorities().tolist()))
+
+    def position_for(self, priority: float) -> int:
+        """
+        Queue position a patient with the given priority would take, without sorting
+        Args:
+            priority: Final priority of the patient
+        Returns:
+            int: Number of queued patients with a strictly higher priority (0-based position)
+        """
+        return int(np.count_nonzero(self.priorities() > priority))
+
+    def update_priorities(self):
+        """Refresh every patient's priority_score with its current time urgency (ordering needs no update)"""
+        for patient in self._slot_patients:
+            patient.risk_assessment.calculate_priority_score()
+
+    def risk_counts(self) -> np.ndarray:
+        """Number of queued patients per risk level index"""
+        return np.bincount(self._columns['risk_idx'][:len(self._slot_patients)], minlength=len(BASE_SCORES))
+
+    def _add_slot(self, patient: PatientQueue):
+        """Append a patient's priority inputs to the columns, growing them if full"""
+        slot = len(self._slot_patients)
+        if slot == len(self._columns['risk_idx']):
+            for name, column in self._columns.items():
+                self._columns[name] = np.concatenate([column, np.zeros_like(column)])
+
+        assessment = patient.risk_assessment
+        c = self._columns
+        c['base_priority'][slot] = assessment.base_priority
+        c['risk_idx'][slot] = assessment.risk_index
+        c['enqueue_ns'][slot] = assessment.enqueue_ns
+
+        self._slot_patients.append(patient)
+        self._slots[patient.patient_id] = slot
+
+    def _free_slot(self, patient_id: str):
+        """Release a patient's slot by moving the last slot into it"""
+        slot = self._slots.pop(patient_id)
+        last = len(self._slot_patients) - 1
+        if slot != last:
+            for column in self._columns.values():
+                column[slot] = column[last]
+            moved = self._slot_patients[last]
+            self._slot_patients[slot] = moved
+            self._slots[moved.patient_id] = slot
+        self._slot_patients.pop()
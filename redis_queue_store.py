@@ -0,0 +1,242 @@
+"""
+Redis-backed patient queue
+Shares one queue between API worker processes. Final priorities keep changing
+(time urgency grows at a different rate per risk level), so no stored score
+stays in order; instead each patient's priority inputs are kept as a short
+string in one hash, and pop, position and risk count queries are Lua scripts
+that score the queue inside Redis in a single round trip, without loading or
+deserializing patients. Each patient's data is stored as JSON under its own
+key, and a sorted set scored by arrival time holds the queue membership.
+"""
+
+import numpy as np
+import orjson
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Optional
+from models import PatientQueue, RiskAssessment, VitalSigns, BASE_SCORES, TIME_DIVISORS, RISK_LOW
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Only needed when the queue is shared through Redis
+    aioredis = None
+
+QUEUE_KEY = "queue"
+PRIORITY_INPUTS_KEY = "queue:priority_inputs"
+PATIENT_NUMBER_KEY = "queue:patient_number"
+PATIENT_KEY_PREFIX = "patient:"
+
+# Lua counterpart of QueueStore.priorities() for one "base enqueue_s rl_adjustment risk_idx"
+# string from PRIORITY_INPUTS_KEY, at wall-clock time now (seconds)
+_LUA_PRIORITY = """
+local time_divisors = {%s}
+local function priority(inputs, now)
+    local base, enqueue_s, rl_adjustment, risk_idx = string.match(inputs, '(%%S+) (%%S+) (%%S+) (%%S+)')
+    risk_idx = tonumber(risk_idx)
+    local p = tonumber(base) * (1 + (now - tonumber(enqueue_s)) / 60 / time_divisors[risk_idx + 1])
+    if risk_idx == %d then
+        p = p + tonumber(rl_adjustment)
+    end
+    return p
+end
+local now = tonumber(ARGV[1])
+local entries = redis.call('HGETALL', KEYS[1])
+""" % (", ".join(str(d) for d in TIME_DIVISORS), RISK_LOW)
+
+# Remove the highest priority patient and return its JSON. Patient keys are derived
+# from the popped id, so the script assumes a single (non-cluster) Redis
+_LUA_POP = _LUA_PRIORITY + """
+local best_id, best
+for i = 1, #entries, 2 do
+    local p = priority(entries[i + 1], now)
+    if best == nil or p > best then
+        best_id, best = entries[i], p
+    end
+end
+if best_id == nil then
+    return false
+end
+redis.call('HDEL', KEYS[1], best_id)
+redis.call('ZREM', KEYS[2], best_id)
+local record = redis.call('GET', ARGV[2] .. best_id)
+redis.call('DEL', ARGV[2] .. best_id)
+return record
+"""
+
+# Count the patients whose priority is strictly higher than ARGV[2]
+_LUA_POSITION = _LUA_PRIORITY + """
+local threshold = tonumber(ARGV[2])
+local count = 0
+for i = 2, #entries, 2 do
+    if priority(entries[i], now) > threshold then
+        count = count + 1
+    end
+end
+return count
+"""
+
+# Replace the priority inputs and JSON of the patients still queued; ARGV holds
+# (patient_id, priority inputs, JSON) triples after the patient key prefix
+_LUA_STORE_RL = """
+for i = 2, #ARGV, 3 do
+    local patient_id = ARGV[i]
+    if redis.call('HEXISTS', KEYS[1], patient_id) == 1 then
+        redis.call('HSET', KEYS[1], patient_id, ARGV[i + 1])
+        redis.call('SET', ARGV[1] .. patient_id, ARGV[i + 2])
+    end
+end
+return 0
+"""
+
+# Count the patients per risk level index
+_LUA_RISK_COUNTS = """
+local counts = {}
+for i = 1, tonumber(ARGV[1]) do
+    counts[i] = 0
+end
+for _, inputs in ipairs(redis.call('HVALS', KEYS[1])) do
+    local risk_idx = tonumber(string.match(inputs, '(%S+)$')) + 1
+    counts[risk_idx] = counts[risk_idx] + 1
+end
+return counts
+"""
+
+def _priority_inputs(patient: PatientQueue) -> str:
+    """Priority inputs of a patient as stored in PRIORITY_INPUTS_KEY"""
+    assessment = patient.risk_assessment
+    return (f"{assessment.base_priority!r} {assessment.timestamp.timestamp()!r} "
+            f"{float(patient.rl_adjustment)!r} {assessment.risk_index}")
+
+def _dump_patient(patient: PatientQueue) -> bytes:
+    """Serialize a queued patient to JSON"""
+    assessment = patient.risk_assessment
+    return orjson.dumps({
+        "patient_id": patient.patient_id,
+        "risk_level": assessment.risk_level,
+        "confidence_score": assessment.confidence_score,
+        "timestamp": assessment.timestamp,
+        "vital_signs": asdict(assessment.vital_signs),
+        "rl_adjustment": patient.rl_adjustment,
+        "rl_state": patient.rl_state,
+        "rl_action": patient.rl_action
+    })
+
+def _load_patient(data: bytes) -> PatientQueue:
+    """Rebuild a queued patient from its JSON"""
+    fields = orjson.loads(data)
+    assessment = RiskAssessment(
+        risk_level=fields["risk_level"],
+        vital_signs=VitalSigns(**fields["vital_signs"]),
+        confidence_score=fields["confidence_score"],
+        timestamp=datetime.fromisoformat(fields["timestamp"])
+    )
+    assessment.calculate_priority_score()
+    return PatientQueue(
+        patient_id=fields["patient_id"],
+        risk_assessment=assessment,
+        rl_adjustment=fields["rl_adjustment"],
+        rl_state=tuple(fields["rl_state"]) if fields["rl_state"] is not None else None,
+        rl_action=fields["rl_action"]
+    )
+
+class RedisQueueStore:
+    """
+    Priority queue of waiting patients kept in Redis (async counterpart of QueueStore)
+    Low-risk patients are ordered with the rl_adjustment last written back by
+    store_rl_adjustments().
+    """
+
+    def __init__(self, url: str):
+        """
+        Args:
+            url: Redis connection URL, e.g. redis://localhost:6379/0
+        """
+        if aioredis is None:
+            raise ImportError("The redis package is required to share the patient queue through Redis")
+        self._redis = aioredis.Redis.from_url(url)
+        self._pop_script = self._redis.register_script(_LUA_POP)
+        self._position_script = self._redis.register_script(_LUA_POSITION)
+        self._risk_counts_script = self._redis.register_script(_LUA_RISK_COUNTS)
+        self._store_rl_script = self._redis.register_script(_LUA_STORE_RL)
+
+    async def close(self):
+        """Close the Redis connection pool"""
+        await self._redis.aclose()
+
+    async def size(self) -> int:
+        """Number of patients waiting"""
+        return await self._redis.zcard(QUEUE_KEY)
+
+    async def next_patient_number(self) -> int:
+        """Next patient number, unique across every process sharing the queue"""
+        return await self._redis.incr(PATIENT_NUMBER_KEY)
+
+    async def patients(self) -> List[PatientQueue]:
+        """Patients currently waiting, in arrival order"""
+        patient_ids = await self._redis.zrange(QUEUE_KEY, 0, -1)
+        if not patient_ids:
+            return []
+        records = await self._redis.mget([PATIENT_KEY_PREFIX + pid.decode() for pid in patient_ids])
+        return [_load_patient(record) for record in records if record is not None]
+
+    async def push(self, patient: PatientQueue):
+        """Add a patient, or replace a queued one's data"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(PATIENT_KEY_PREFIX + patient.patient_id, _dump_patient(patient))
+            pipe.hset(PRIORITY_INPUTS_KEY, patient.patient_id, _priority_inputs(patient))
+            pipe.zadd(QUEUE_KEY, {patient.patient_id: patient.risk_assessment.timestamp.timestamp()}, nx=True)
+            await pipe.execute()
+
+    async def pop(self) -> Optional[PatientQueue]:
+        """Remove and return the highest priority patient as of now"""
+        record = await self._pop_script(keys=[PRIORITY_INPUTS_KEY, QUEUE_KEY], args=[time.time(), PATIENT_KEY_PREFIX])
+        return _load_patient(record) if record else None
+
+    async def remove(self, patient_id: str) -> Optional[PatientQueue]:
+        """Remove and return a queued patient, None if not queued"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(PRIORITY_INPUTS_KEY, patient_id)
+            pipe.zrem(QUEUE_KEY, patient_id)
+            pipe.getdel(PATIENT_KEY_PREFIX + patient_id)
+            _, _, record = await pipe.execute()
+        return _load_patient(record) if record is not None else None
+
+    async def store_rl_adjustments(self, patients: List[PatientQueue]):
+        """
+        Write the RL adjustment, state and action of loaded patients back to Redis
+        Patients popped or removed by another process in the meantime are skipped.
+        Args:
+            patients: Patients returned by patients() after an RL scheduling pass
+        """
+        if not patients:
+            return
+        args = [PATIENT_KEY_PREFIX]
+        for patient in patients:
+            args += (patient.patient_id, _priority_inputs(patient), _dump_patient(patient))
+        await self._store_rl_script(keys=[PRIORITY_INPUTS_KEY], args=args)
+
+    async def clear(self):
+        """Remove every patient"""
+        patient_ids = await self._redis.zrange(QUEUE_KEY, 0, -1)
+        await self._redis.delete(
+            QUEUE_KEY, PRIORITY_INPUTS_KEY, *(PATIENT_KEY_PREFIX + pid.decode() for pid in patient_ids)
+        )
+
+    async def position_for(self, priority: float) -> int:
+        """
+        Queue position a patient with the given priority would take
+        Args:
+            priority: Final priority of the patient
+        Returns:
+            int: Number of queued patients with a strictly higher priority (0-based position)
+        """
+        return await self._position_script(keys=[PRIORITY_INPUTS_KEY], args=[time.time(), repr(float(priority))])
+
+    async def update_priorities(self):
+        """Priorities are computed from the stored inputs whenever they are read; nothing to re-score"""
+
+    async def risk_counts(self) -> np.ndarray:
+        """Number of queued patients per risk level index"""
+        counts = await self._risk_counts_script(keys=[PRIORITY_INPUTS_KEY], args=[len(BASE_SCORES)])
+        return np.array(counts, dtype=np.int64)
\ No newline at end of file
@@ -5,26 +5,387 @@ for low-risk patients while maintaining priority for high-risk patients.
 """
 
 import numpy as np
+import hashlib
 import json
 import os
-from typing import Dict, List, Tuple
+import random
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 from datetime import datetime, timedelta
 from models import RiskAssessment, PatientQueue
 
+try:
+    import numba
+except ImportError:  # The Q-learning update runs as plain Python
+    numba = None
+
+# RL state: (risk_level, confidence_bucket, queue_length, high_risk_count, time_bucket)
+State = Tuple[str, int, int, int, str]
+
+def _state_to_key(state: State) -> str:
+    """Encode a state as a Q-table file key"""
+    return "|".join(map(str, state))
+
+def _state_from_key(key: str) -> State:
+    """Decode a Q-table file key (also accepts the older '_'-joined keys)"""
+    risk_level, confidence_bucket, queue_length, high_risk_count, time_bucket = key.rsplit('|' if '|' in key else '_', 4)
+    return (risk_level, int(confidence_bucket), int(queue_length), int(high_risk_count), time_bucket)
+
+def _q_update(q_values, next_q_values, action_idx, reward, learning_rate, discount_factor):
+    """Q-learning update of q_values[action_idx] in place (compiled with Numba when installed)"""
+    current_q = q_values[action_idx]
+    max_next_q = next_q_values.max()
+    
+    q_values[action_idx] = current_q + learning_rate * (
+        reward + discount_factor * max_next_q - current_q
+    )
+    return q_values[action_idx]
+
+if numba is not None:
+    _q_update = numba.njit(cache=True, fastmath=True)(_q_update)
+
+# Rewards are clamped to this magnitude so converged Q-values (up to
+# reward / (1 - discount_factor)) stay well inside the float16 range
+REWARD_LIMIT = 64.0
+
+class QTable:
+    """
+    Tabular Q-values with one row per visited state
+    Rows live in a single growable float16 array (tabular Q-learning tolerates
+    the precision, and it halves memory and file size). save() appends newly
+    seen states to a key log and writes only the rows updated since the
+    previous save through a memory-mapped file, so a checkpoint costs
+    O(changes) rather than O(table).
+    """
+    
+    def __init__(self, n_actions: int, capacity: int = 1024):
+        """
+        Args:
+            n_actions: Number of actions (row length)
+            capacity: Initial number of rows (grows on demand)
+        """
+        self.n_actions = n_actions
+        self._states: List[State] = []  # row -> state, in insertion order
+        self._index: Dict[State, int] = {}  # state -> row
+        self._values = np.zeros((capacity, n_actions), dtype=np.float16)
+        self._dirty: Set[int] = set()  # rows updated since the last save
+        self._saved_states = 0  # states already written to the key log
+    
+    def __len__(self) -> int:
+        return len(self._states)
+    
+    def q_values(self, state: State) -> np.ndarray:
+        """
+        Get the Q-values of a state, adding a zero row the first time it is seen
+        Args:
+            state: State representation
+        Returns:
+            np.ndarray: View of the state's row (valid until the table next grows)
+        """
+        row = self._row(state)  # Before reading self._values, which this may reallocate
+        return self._values[row]
+    
+    def q_values_batch(self, states: Sequence[State]) -> np.ndarray:
+        """Q-values of several states as an (N, n_actions) array (a copy), adding rows for new states"""
+        rows = [self._row(state) for state in states]
+        return self._values[rows]
+    
+    def update(self, state: State, action_idx: int, reward: float, next_state: State,
+               learning_rate: float, discount_factor: float):
+        """Apply the Q-learning update rule for one transition"""
+        # Resolve both rows first: adding a state can reallocate the array
+        row = self._row(state)
+        next_row = self._row(next_state)
+        reward = min(max(reward, -REWARD_LIMIT), REWARD_LIMIT)
+        
+        # Update in float32 and store the result back as float16
+        q_values = self._values[row].astype(np.float32)
+        _q_update(q_values, self._values[next_row].astype(np.float32), action_idx, reward,
+                  learning_rate, discount_factor)
+        self._values[row] = q_values
+        self._dirty.add(row)
+    
+    def rows(self) -> Tuple[List[State], np.ndarray]:
+        """Every state in the table and its Q-values (row i belongs to state i)"""
+        return list(self._states), self._values[:len(self._states)]
+    
+    def set_rows(self, states: Sequence[State], values: np.ndarray):
+        """Replace the table contents; everything is written on the next save"""
+        n = len(states)
+        self._states = list(states)
+        self._index = {state: i for i, state in enumerate(self._states)}
+        self._values = np.zeros((max(len(self._values), n), self.n_actions), dtype=self._values.dtype)
+        self._values[:n] = values
+        self._dirty = set(range(n))
+        self._saved_states = 0
+    
+    def save(self, path: str):
+        """
+        Write the changes since the previous save
+        Args:
+            path: File path prefix (rows go to <path>.bin, state keys to <path>.states)
+        """
+        n = len(self._states)
+        if self._saved_states == 0 or self._saved_states < n:
+            with open(path + '.states', 'a' if self._saved_states else 'w') as f:
+                f.writelines(_state_to_key(state) + '\n' for state in self._states[self._saved_states:])
+            self._saved_states = n
+        
+        # Size the row file to the table (new rows start as zeros), then write changed rows in place
+        with open(path + '.bin', 'ab') as f:
+            f.truncate(n * self.n_actions * self._values.itemsize)
+        if self._dirty:
+            rows = np.memmap(path + '.bin', dtype=self._values.dtype, mode='r+', shape=(n, self.n_actions))
+            dirty = np.fromiter(self._dirty, dtype=np.intp, count=len(self._dirty))
+            rows[dirty] = self._values[dirty]
+            rows.flush()
+            del rows
+            self._dirty.clear()
+    
+    def load(self, path: str) -> bool:
+        """
+        Load a table written by save()
+        Args:
+            path: File path prefix passed to save()
+        Returns:
+            bool: False if there is no saved table at path
+        """
+        if not (os.path.exists(path + '.states') and os.path.exists(path + '.bin')):
+            return False
+        
+        with open(path + '.states') as f:
+            states = [_state_from_key(line.rstrip('\n')) for line in f if line.strip()]
+        
+        # Tables saved before the switch to float16 hold float32 rows
+        dtype = self._values.dtype
+        if os.path.getsize(path + '.bin') == len(states) * self.n_actions * np.dtype(np.float32).itemsize:
+            dtype = np.float32
+        rows = np.fromfile(path + '.bin', dtype=dtype).reshape(-1, self.n_actions)
+        
+        n = min(len(states), len(rows))
+        self.set_rows(states[:n], rows[:n])
+        if len(states) == len(rows) and dtype == self._values.dtype:
+            # Files are in step, so the next save only needs to write changes
+            self._dirty.clear()
+            self._saved_states = n
+        return True
+    
+    def _row(self, state: State) -> int:
+        """Row index of a state, appending a zero row for a new state"""
+        row = self._index.get(state)
+        if row is None:
+            row = len(self._states)
+            if row == len(self._values):
+                self._values = np.concatenate([self._values, np.zeros_like(self._values)])
+            self._states.append(state)
+            self._index[state] = row
+        return row
+
+@lru_cache(maxsize=4096)
+def _plane_rows(state: State, n_planes: int, plane_size: int) -> np.ndarray:
+    """Row of a state in each plane, from one stable hash (Python's hash() changes per process)"""
+    digest = hashlib.blake2b(_state_to_key(state).encode(), digest_size=4 * n_planes).digest()
+    return np.frombuffer(digest, dtype='<u4') % plane_size
+
+class QVStore:
+    """
+    Q-values as the sum of k hashed planes (Athena-style partitioned Q-table)
+    Each plane is a small table indexed by a different hash of the state, and
+    Q(s, a) is the sum of the state's rows across planes. Memory is fixed at
+    n_planes * plane_size rows however many states are seen, and states that
+    collide in one plane share what they learn there but are told apart by
+    the others.
+    """
+    
+    def __init__(self, n_actions: int, n_planes: int = 4, plane_size: int = 512):
+        """
+        Args:
+            n_actions: Number of actions (row length)
+            n_planes: Number of hashed planes (k)
+            plane_size: Rows per plane
+        """
+        self.n_actions = n_actions
+        self._planes = np.zeros((n_planes, plane_size, n_actions), dtype=np.float32)
+        self._plane_ids = np.arange(n_planes)
+    
+    def q_values(self, state: State) -> np.ndarray:
+        """
+        Get the Q-values of a state
+        Args:
+            state: State representation
+        Returns:
+            np.ndarray: Q-value per action (a new array)
+        """
+        n_planes, plane_size, _ = self._planes.shape
+        return self._planes[self._plane_ids, _plane_rows(state, n_planes, plane_size)].sum(axis=0)
+    
+    def q_values_batch(self, states: Sequence[State]) -> np.ndarray:
+        """Q-values of several states as an (N, n_actions) array, gathered from every plane at once"""
+        n_planes, plane_size, _ = self._planes.shape
+        rows = np.stack([_plane_rows(state, n_planes, plane_size) for state in states])
+        return self._planes[self._plane_ids, rows].sum(axis=1)
+    
+    def update(self, state: State, action_idx: int, reward: float, next_state: State,
+               learning_rate: float, discount_factor: float):
+        """Apply the Q-learning update rule for one transition, split evenly across the planes"""
+        n_planes, plane_size, _ = self._planes.shape
+        q_values = self.q_values(state)
+        current_q = q_values[action_idx]
+        new_q = _q_update(q_values, self.q_values(next_state), action_idx, reward, learning_rate, discount_factor)
+        
+        rows = _plane_rows(state, n_planes, plane_size)
+        self._planes[self._plane_ids, rows, action_idx] += (new_q - current_q) / n_planes
+    
+    def set_rows(self, states: Sequence[State], values: np.ndarray):
+        """Replace the planes with ones encoding per-state Q-values (approximately, where states collide)"""
+        n_planes, plane_size, _ = self._planes.shape
+        self._planes[:] = 0.0
+        for state, q_values in zip(states, np.asarray(values, dtype=np.float32)):
+            self._planes[self._plane_ids, _plane_rows(state, n_planes, plane_size)] += q_values / n_planes
+    
+    def save(self, path: str):
+        """
+        Write the planes to <path>.planes.npy
+        Args:
+            path: File path prefix
+        """
+        np.save(path + '.planes.npy', self._planes)
+    
+    def load(self, path: str) -> bool:
+        """
+        Load planes written by save()
+        Args:
+            path: File path prefix passed to save()
+        Returns:
+            bool: False if there are no saved planes of this shape at path
+        """
+        if not os.path.exists(path + '.planes.npy'):
+            return False
+        planes = np.load(path + '.planes.npy')
+        if planes.shape != self._planes.shape:
+            return False
+        self._planes = planes.astype(np.float32)
+        return True
+
+# Categories one-hot encoded in the linear Q-function's state features
+_RISK_LEVELS = ('low', 'medium', 'high')
+_TIME_BUCKETS = ('morning', 'afternoon', 'evening')
+
+@lru_cache(maxsize=4096)
+def _state_features(state: State) -> np.ndarray:
+    """
+    Feature vector phi(s) of a state for the linear Q-function
+    Args:
+        state: State tuple
+    Returns:
+        np.ndarray: Bias, risk level one-hot, confidence, queue length and high-risk
+        count scaled to [0, 1], and time of day one-hot (read-only, shared by the cache)
+    """
+    risk_level, confidence_bucket, queue_length, high_risk_count, time_bucket = state
+    phi = np.zeros(5 + len(_RISK_LEVELS) + len(_TIME_BUCKETS), dtype=np.float32)
+    phi[0] = 1.0
+    if risk_level in _RISK_LEVELS:
+        phi[1 + _RISK_LEVELS.index(risk_level)] = 1.0
+    offset = 1 + len(_RISK_LEVELS)
+    phi[offset] = confidence_bucket / 10.0
+    phi[offset + 1] = queue_length / 10.0
+    phi[offset + 2] = high_risk_count / 5.0
+    if time_bucket in _TIME_BUCKETS:
+        phi[offset + 3 + _TIME_BUCKETS.index(time_bucket)] = 1.0
+    phi.flags.writeable = False
+    return phi
+
+class LinearQFunction:
+    """
+    Q-values approximated as Q(s, a) = phi(s) . theta[:, a]
+    One small weight matrix replaces the per-state table, so memory and
+    checkpoint size are fixed, and what is learned for one state generalizes
+    to states with similar features.
+    """
+    
+    def __init__(self, n_actions: int):
+        """
+        Args:
+            n_actions: Number of actions (columns of theta)
+        """
+        self.n_actions = n_actions
+        self.theta = np.zeros((len(_state_features(('', 0, 0, 0, ''))), n_actions), dtype=np.float32)
+    
+    def q_values(self, state: State) -> np.ndarray:
+        """
+        Get the Q-values of a state
+        Args:
+            state: State representation
+        Returns:
+            np.ndarray: Q-value per action (a new array)
+        """
+        return _state_features(state) @ self.theta
+    
+    def q_values_batch(self, states: Sequence[State]) -> np.ndarray:
+        """Q-values of several states as an (N, n_actions) array from one matrix product"""
+        return np.stack([_state_features(state) for state in states]) @ self.theta
+    
+    def update(self, state: State, action_idx: int, reward: float, next_state: State,
+               learning_rate: float, discount_factor: float):
+        """Semi-gradient Q-learning update of theta[:, action_idx] for one transition"""
+        phi = _state_features(state)
+        td_error = (reward + discount_factor * self.q_values(next_state).max()
+                    - phi @ self.theta[:, action_idx])
+        self.theta[:, action_idx] += learning_rate * td_error * phi
+    
+    def set_rows(self, states: Sequence[State], values: np.ndarray):
+        """Fit theta to per-state Q-values by least squares"""
+        features = np.stack([_state_features(state) for state in states])
+        self.theta = np.linalg.lstsq(features, np.asarray(values, dtype=np.float32), rcond=None)[0].astype(np.float32)
+    
+    def save(self, path: str):
+        """
+        Write theta to <path>.theta.npy
+        Args:
+            path: File path prefix
+        """
+        np.save(path + '.theta.npy', self.theta)
+    
+    def load(self, path: str) -> bool:
+        """
+        Load theta written by save()
+        Args:
+            path: File path prefix passed to save()
+        Returns:
+            bool: False if there are no saved weights of this shape at path
+        """
+        if not os.path.exists(path + '.theta.npy'):
+            return False
+        theta = np.load(path + '.theta.npy')
+        if theta.shape != self.theta.shape:
+            return False
+        self.theta = theta.astype(np.float32)
+        return True
+
 class PatientSchedulerRL:
     """
     RL-based scheduler that learns optimal scheduling policies for different risk levels
     """
     
-    def __init__(self, learning_rate=0.1, discount_factor=0.95, epsilon=0.1, epsilon_decay=0.995):
+    # Effect of each action, indexed as in self.actions: minutes added to the
+    # estimated wait time and the RL priority adjustment
+    _DELAYS = np.array([0, 15, 30, 60, 120], dtype=np.int32)
+    _BOOSTS = np.array([10.0, 2.0, 0.0, -3.0, -8.0], dtype=np.float32)
+    
+    def __init__(self, learning_rate=0.1, discount_factor=0.95, epsilon=0.1, epsilon_decay=0.995,
+                 q_table: Optional[Union[LinearQFunction, QVStore, QTable]] = None,
+                 seed: Optional[int] = None):
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.epsilon = epsilon
         self.epsilon_decay = epsilon_decay
         self.min_epsilon = 0.01
         
-        # Q-table: state -> action -> value
-        self.q_table: Dict[str, Dict[str, float]] = {}
+        # Exploration draws, reproducible when seeded: a scalar generator for single
+        # decisions (choose_action) and a NumPy one for whole-queue batches
+        self._random = random.Random(seed)
+        self._rng = np.random.default_rng(seed)
         
         # Action space for low-risk patients
         self.actions = {
@@ -34,30 +395,53 @@ class PatientSchedulerRL:
             'delay_60': 3,       # Delay 60 minutes
             'delay_120': 4       # Delay 2 hours
         }
+        self.action_names = tuple(self.actions)
+        
+        # Q-values of each action, indexed as in self.actions: a linear function of
+        # state features by default, or pass a QVStore (hashed planes) or QTable
+        # (one exact row per state)
+        self.q_table = q_table if q_table is not None else LinearQFunction(len(self.action_names))
         
         # Load existing Q-table if available
         self.load_q_table()
     
-    def get_state(self, patient: PatientQueue, queue_info: Dict) -> str:
+    @staticmethod
+    def get_time_bucket() -> str:
+        """Current time of day bucket used in the RL state"""
+        hour = datetime.now().hour
+        return 'morning' if 6 <= hour < 12 else 'afternoon' if 12 <= hour < 18 else 'evening'
+    
+    def get_state(self, patient: PatientQueue, queue_info: Dict, time_bucket: Optional[str] = None) -> State:
         """
         Generate state representation for RL
         Args:
             patient: PatientQueue object
             queue_info: Dictionary with current queue information
+            time_bucket: Time of day bucket, computed once per scheduling round (read from the clock if None)
         Returns:
-            str: State representation
+            State: State tuple (hashes faster than an equivalent string key)
         """
-        risk_level = patient.risk_assessment.risk_level.lower()
+        risk_level = patient.risk_assessment.risk_level_lc
         confidence_bucket = int(patient.risk_assessment.confidence_score * 10)  # 0-10
         queue_length = min(queue_info.get('total_patients', 0), 10)  # Cap at 10
         high_risk_count = min(queue_info.get('high_risk_count', 0), 5)  # Cap at 5
-        hour = datetime.now().hour
-        time_bucket = 'morning' if 6 <= hour < 12 else 'afternoon' if 12 <= hour < 18 else 'evening'
+        if time_bucket is None:
+            time_bucket = self.get_time_bucket()
         
-        state = f"{risk_level}_{confidence_bucket}_{queue_length}_{high_risk_count}_{time_bucket}"
+        state = (risk_level, confidence_bucket, queue_length, high_risk_count, time_bucket)
         return state
     
-    def choose_action(self, state: str) -> str:
+    def get_q_values(self, state: State) -> np.ndarray:
+        """
+        Get the Q-values of a state
+        Args:
+            state: State representation
+        Returns:
+            np.ndarray: Q-value per action
+        """
+        return self.q_table.q_values(state)
+    
+    def choose_action(self, state: State) -> str:
         """
         Choose action using epsilon-greedy policy
         Args:
@@ -65,16 +449,28 @@ class PatientSchedulerRL:
         Returns:
             str: Action to take
         """
-        if state not in self.q_table:
-            self.q_table[state] = {action: 0.0 for action in self.actions.keys()}
+        # Exploration: random action
+        if self._random.random() < self.epsilon:
+            return self.action_names[self._random.randrange(len(self.action_names))]
+        
+        # Exploitation: best action (first one on ties)
+        return self.action_names[int(self.get_q_values(state).argmax())]
+    
+    def _choose_action_indices(self, q_values: np.ndarray) -> np.ndarray:
+        """
+        Epsilon-greedy action selection for several states at once
+        Args:
+            q_values: (N, n_actions) Q-values, one row per state
+        Returns:
+            np.ndarray: Action index per state
+        """
+        # Exploitation: best action (first one on ties)
+        actions = q_values.argmax(axis=1)
         
-        # Epsilon-greedy action selection
-        if np.random.random() < self.epsilon:
-            # Exploration: random action
-            return np.random.choice(list(self.actions.keys()))
-        else:
-            # Exploitation: best action
-            return max(self.q_table[state], key=self.q_table[state].get)
+        # Exploration: random action
+        explore = self._rng.random(len(actions)) < self.epsilon
+        actions[explore] = self._rng.integers(len(self.action_names), size=int(explore.sum()))
+        return actions
     
     def get_reward(self, action: str, patient: PatientQueue, outcome: Dict) -> float:
         """
@@ -108,7 +504,7 @@ class PatientSchedulerRL:
         base_reward += resource_utilization * 5.0
         
         # Bonus for appropriate scheduling of low-risk patients
-        if patient.risk_assessment.risk_level.lower() == "low":
+        if patient.risk_assessment.risk_level_lc == "low":
             if action in ['delay_30', 'delay_60'] and patient_satisfaction > 0.7:
                 base_reward += 3.0  # Good balance
             elif action == 'immediate' and resource_utilization < 0.3:
@@ -116,7 +512,7 @@ class PatientSchedulerRL:
         
         return base_reward
     
-    def update_q_value(self, state: str, action: str, reward: float, next_state: str):
+    def update_q_value(self, state: State, action: str, reward: float, next_state: State):
         """
         Update Q-value using Q-learning update rule
         Args:
@@ -125,21 +521,8 @@ class PatientSchedulerRL:
             reward: Reward received
             next_state: Next state
         """
-        if state not in self.q_table:
-            self.q_table[state] = {a: 0.0 for a in self.actions.keys()}
-        
-        if next_state not in self.q_table:
-            self.q_table[next_state] = {a: 0.0 for a in self.actions.keys()}
-        
         # Q-learning update
-        current_q = self.q_table[state][action]
-        max_next_q = max(self.q_table[next_state].values())
-        
-        new_q = current_q + self.learning_rate * (
-            reward + self.discount_factor * max_next_q - current_q
-        )
-        
-        self.q_table[state][action] = new_q
+        self.q_table.update(state, self.actions[action], reward, next_state, self.learning_rate, self.discount_factor)
         
         # Decay epsilon
         self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
@@ -153,24 +536,27 @@ class PatientSchedulerRL:
         Returns:
             PatientQueue: Modified patient object
         """
-        action_effects = {
-            'immediate': {'delay': 0, 'priority_boost': 10.0},
-            'delay_15': {'delay': 15, 'priority_boost': 2.0},
-            'delay_30': {'delay': 30, 'priority_boost': 0.0},
-            'delay_60': {'delay': 60, 'priority_boost': -3.0},
-            'delay_120': {'delay': 120, 'priority_boost': -8.0}
-        }
-        
-        effect = action_effects.get(action, action_effects['delay_30'])
-        
-        # Apply delay to estimated wait time
-        patient.estimated_wait_time += effect['delay']
-        
-        # Apply RL adjustment to priority
-        patient.rl_adjustment = effect['priority_boost']
-        
+        # Unknown actions behave like delay_30
+        action_idx = self.actions.get(action, self.actions['delay_30'])
+        self._apply_action_indices([patient], np.array([action_idx]))
         return patient
     
+    def _apply_action_indices(self, patients: List[PatientQueue], actions: np.ndarray):
+        """
+        Apply one action per patient, gathering every delay and adjustment at once
+        Args:
+            patients: PatientQueue objects to modify
+            actions: Action index per patient
+        """
+        delays = self._DELAYS[actions].tolist()
+        boosts = self._BOOSTS[actions].tolist()
+        for patient, delay, boost in zip(patients, delays, boosts):
+            # Apply delay to estimated wait time
+            patient.estimated_wait_time += delay
+            
+            # Apply RL adjustment to priority
+            patient.rl_adjustment = boost
+    
     def schedule_patients_with_rl(self, patients: List[PatientQueue], queue_info: Dict) -> List[PatientQueue]:
         """
         Schedule patients using RL for low-risk patients
@@ -180,20 +566,8 @@ class PatientSchedulerRL:
         Returns:
             List[PatientQueue]: Scheduled patients
         """
-        scheduled_patients = []
-        
-        for patient in patients:
-            if patient.risk_assessment.risk_level.lower() == "low":
-                # Use RL for low-risk patients
-                state = self.get_state(patient, queue_info)
-                action = self.choose_action(state)
-                patient = self.apply_action_to_patient(action, patient)
-                
-                # Store state-action for potential learning update
-                patient.rl_state = state
-                patient.rl_action = action
-            
-            scheduled_patients.append(patient)
+        self.apply_rl_actions(patients, queue_info)
+        scheduled_patients = list(patients)
         
         # Sort by final priority (including RL adjustments)
         scheduled_patients.sort(key=lambda p: p.get_final_priority(), reverse=True)
@@ -204,6 +578,28 @@ class PatientSchedulerRL:
         
         return scheduled_patients
     
+    def apply_rl_actions(self, patients: List[PatientQueue], queue_info: Dict):
+        """
+        Choose and apply an RL action for every low-risk patient, without reordering
+        Args:
+            patients: List of PatientQueue objects (modified in place)
+            queue_info: Current queue information
+        """
+        low_risk = [p for p in patients if p.risk_assessment.risk_level_lc == "low"]
+        if low_risk:
+            # Same for every patient in this round, so read the clock once
+            time_bucket = self.get_time_bucket()
+            states = [self.get_state(patient, queue_info, time_bucket) for patient in low_risk]
+            
+            # Epsilon-greedy actions for every patient at once
+            actions = self._choose_action_indices(self.q_table.q_values_batch(states))
+            self._apply_action_indices(low_risk, actions)
+            
+            for patient, state, action_idx in zip(low_risk, states, actions.tolist()):
+                # Store state-action for potential learning update
+                patient.rl_state = state
+                patient.rl_action = self.action_names[action_idx]
+    
     def provide_feedback(self, patient_id: str, outcome: Dict):
         """
         Provide feedback to the RL system for learning
@@ -216,31 +612,65 @@ class PatientSchedulerRL:
         # This is a simplified version
         pass
     
-    def save_q_table(self, filename: str = "q_table.json"):
-        """Save Q-table to file"""
+    def save_q_table(self, filename: str = "q_table"):
+        """Save Q-table changes to file"""
         filepath = os.path.join(os.path.dirname(__file__), filename)
-        with open(filepath, 'w') as f:
-            json.dump(self.q_table, f, indent=2)
+        self.q_table.save(filepath)
     
-    def load_q_table(self, filename: str = "q_table.json"):
+    def load_q_table(self, filename: str = "q_table"):
         """Load Q-table from file"""
         filepath = os.path.join(os.path.dirname(__file__), filename)
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r') as f:
-                    self.q_table = json.load(f)
-            except Exception as e:
-                print(f"Error loading Q-table: {e}")
-                self.q_table = {}
+        try:
+            if self.q_table.load(filepath):
+                return
+            
+            # Import a table saved by an earlier version: tabular rows, or JSON
+            # (older JSON stores each state as an action -> value dict)
+            table = QTable(len(self.action_names))
+            if not table.load(filepath) and os.path.exists(filepath + '.json'):
+                with open(filepath + '.json', 'rb') as f:
+                    saved = json.load(f)
+                table.set_rows(
+                    [_state_from_key(key) for key in saved],
+                    np.array([
+                        [values.get(a, 0.0) for a in self.action_names] if isinstance(values, dict) else values
+                        for values in saved.values()
+                    ], dtype=np.float16).reshape(-1, len(self.action_names))
+                )
+            if len(table):
+                self.q_table.set_rows(*table.rows())
+        except Exception as e:
+            print(f"Error loading Q-table: {e}")
+            self.q_table = type(self.q_table)(len(self.action_names))
+
+# Q-value stores selectable by name in PriorityManager
+Q_STORES = {
+    'linear': LinearQFunction,  # Linear in state features, the default
+    'hashed': QVStore,          # Summed hashed planes per state feature
+    'table': QTable             # One exact row per state
+}
 
 class PriorityManager:
     """
     Main priority management system that combines rule-based and RL-based scheduling
     """
     
-    def __init__(self):
-        self.rl_scheduler = PatientSchedulerRL()
-        self.patient_history = []
+    # Number of recent outcomes kept in patient_history
+    HISTORY_SIZE = 1000
+    
+    def __init__(self, q_store: str = 'linear', seed: Optional[int] = None):
+        """
+        Args:
+            q_store: Name of the Q-value store in Q_STORES
+            seed: Seed for the scheduler's exploration draws
+        """
+        if q_store not in Q_STORES:
+            raise ValueError(f"Unknown Q-value store {q_store!r}, expected one of {sorted(Q_STORES)}")
+        q_table = Q_STORES[q_store](len(PatientSchedulerRL._DELAYS))
+        self.rl_scheduler = PatientSchedulerRL(q_table=q_table, seed=seed)
+        # Bounded, as one manager lives for the whole process
+        self.patient_history = deque(maxlen=self.HISTORY_SIZE)
+        self.outcome_count = 0
     
     def calculate_dynamic_priority(self, patients: List[PatientQueue]) -> List[PatientQueue]:
         """
@@ -250,40 +680,78 @@ class PriorityManager:
         Returns:
             List[PatientQueue]: Patients with updated priorities
         """
-        # Prepare queue information for RL
+        queue_info = self._prepare_patients(patients)
+        
+        # Apply RL scheduling
+        scheduled_patients = self.rl_scheduler.schedule_patients_with_rl(patients, queue_info)
+        
+        return scheduled_patients
+    
+    def _prepare_patients(self, patients: List[PatientQueue]) -> Dict:
+        """
+        Refresh every patient's priority score and summarize the queue for RL
+        Args:
+            patients: List of PatientQueue objects
+        Returns:
+            Dict: Queue information passed to the RL scheduler
+        """
+        # Prepare queue information for RL (counted in a single pass)
+        high_risk_count = medium_risk_count = low_risk_count = 0
+        confidence_sum = 0.0
+        for p in patients:
+            risk_level = p.risk_assessment.risk_level_lc
+            if risk_level == "high":
+                high_risk_count += 1
+            elif risk_level == "medium":
+                medium_risk_count += 1
+            elif risk_level == "low":
+                low_risk_count += 1
+            confidence_sum += p.risk_assessment.confidence_score
+        
         queue_info = {
             'total_patients': len(patients),
-            'high_risk_count': len([p for p in patients if p.risk_assessment.risk_level.lower() == "high"]),
-            'medium_risk_count': len([p for p in patients if p.risk_assessment.risk_level.lower() == "medium"]),
-            'low_risk_count': len([p for p in patients if p.risk_assessment.risk_level.lower() == "low"]),
-            'average_confidence': np.mean([p.risk_assessment.confidence_score for p in patients]) if patients else 0.0
+            'high_risk_count': high_risk_count,
+            'medium_risk_count': medium_risk_count,
+            'low_risk_count': low_risk_count,
+            'average_confidence': confidence_sum / len(patients) if patients else 0.0
         }
         
         # Update time factors for all patients
         for patient in patients:
             patient.risk_assessment.calculate_priority_score()
         
-        # Apply RL scheduling
-        scheduled_patients = self.rl_scheduler.schedule_patients_with_rl(patients, queue_info)
-        
-        return scheduled_patients
+        return queue_info
     
-    def get_next_patient(self, patients: List[PatientQueue]) -> PatientQueue:
+    def get_top_patient(self, patients: List[PatientQueue]) -> Optional[PatientQueue]:
         """
-        Get the next patient to be seen
+        Highest priority patient after RL scheduling, found with one linear scan
         Args:
             patients: List of PatientQueue objects
         Returns:
-            PatientQueue: Next patient to be seen
+            PatientQueue: Patient with the highest final priority (first on ties) with
+            queue_position 1, None if empty
         """
         if not patients:
             return None
         
-        # Update priorities
-        updated_patients = self.calculate_dynamic_priority(patients)
+        queue_info = self._prepare_patients(patients)
+        self.rl_scheduler.apply_rl_actions(patients, queue_info)
         
-        # Return highest priority patient
-        return updated_patients[0] if updated_patients else None
+        priorities = np.fromiter((p.get_final_priority() for p in patients), dtype=np.float64, count=len(patients))
+        top_patient = patients[int(priorities.argmax())]
+        top_patient.queue_position = 1
+        return top_patient
+    
+    def get_next_patient(self, patients: List[PatientQueue]) -> PatientQueue:
+        """
+        Get the next patient to be seen
+        Args:
+            patients: List of PatientQueue objects
+        Returns:
+            PatientQueue: Next patient to be seen
+        """
+        # Only the top patient is needed, so skip sorting the whole queue
+        return self.get_top_patient(patients)
     
     def update_with_outcome(self, patient_id: str, outcome: Dict):
         """
@@ -299,6 +767,8 @@ class PriorityManager:
             'timestamp': datetime.now()
         })
         
+        self.outcome_count += 1
+        
         # Periodically save the Q-table
-        if len(self.patient_history) % 10 == 0:
+        if self.outcome_count % 10 == 0:
             self.rl_scheduler.save_q_table()
@@ -1,22 +1,25 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime
 
 class VitalSigns(BaseModel):
-    heart_rate: int
-    respiratory_rate: int
-    body_temperature: float
-    oxygen_saturation: int
-    systolic_blood_pressure: int
-    diastolic_blood_pressure: int
-    age: int
-    gender: int  # 0 for female, 1 for male
-    weight: float
-    height: float
-    derived_hrv: float
-    derived_pulse_pressure: float
-    derived_bmi: float
-    derived_map: float
+    # Requests use the training data's column names; responses use the field names
+    model_config = ConfigDict(populate_by_name=True)
+    
+    heart_rate: float = Field(validation_alias="Heart_Rate")
+    respiratory_rate: float = Field(validation_alias="Respiratory_Rate")
+    body_temperature: float = Field(validation_alias="Body_Temperature")
+    oxygen_saturation: float = Field(validation_alias="Oxygen_Saturation")
+    systolic_blood_pressure: float = Field(validation_alias="Systolic_Blood_Pressure")
+    diastolic_blood_pressure: float = Field(validation_alias="Diastolic_Blood_Pressure")
+    age: float = Field(validation_alias="Age")
+    gender: int = Field(validation_alias="Gender")  # 0 for female, 1 for male
+    weight: float = Field(validation_alias="Weight_kg")
+    height: float = Field(validation_alias="Height_m")
+    derived_hrv: float = Field(validation_alias="Derived_HRV")
+    derived_pulse_pressure: float = Field(validation_alias="Derived_Pulse_Pressure")
+    derived_bmi: float = Field(validation_alias="Derived_BMI")
+    derived_map: float = Field(validation_alias="Derived_MAP")
 
 class RiskPredictionResponse(BaseModel):
     risk_level: str
@@ -6,10 +6,16 @@ Simple test script to verify the FastAPI endpoints work correctly
 import requests
 import json
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 # Base URL for the API
 BASE_URL = "http://127.0.0.1:8002"
 
+# One keep-alive session for every request, so tests reuse the connection
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
 def test_predict_endpoint():
     """Test the /predict/ endpoint"""
     print("Testing /predict/ endpoint...")
@@ -33,7 +39,7 @@ def test_predict_endpoint():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/predict/", json=test_data)
+        response = SESSION.post(f"{BASE_URL}/predict/", json=test_data)
         if response.status_code == 200:
             result = response.json()
             print("✅ /predict/ endpoint working!")
@@ -54,7 +60,7 @@ def test_queue_endpoint():
     print("\nTesting /queue/ endpoint...")
     
     try:
-        response = requests.get(f"{BASE_URL}/queue/")
+        response = SESSION.get(f"{BASE_URL}/queue/")
         if response.status_code == 200:
             result = response.json()
             print("✅ /queue/ endpoint working!")
@@ -75,7 +81,7 @@ def test_next_patient_endpoint():
     print("\nTesting /queue/next/ endpoint...")
     
     try:
-        response = requests.get(f"{BASE_URL}/queue/next/")
+        response = SESSION.get(f"{BASE_URL}/queue/next/")
         if response.status_code == 200:
             result = response.json()
             print("✅ /queue/next/ endpoint working!")
@@ -98,7 +104,7 @@ def test_root_endpoint():
     print("Testing root endpoint...")
     
     try:
-        response = requests.get(f"{BASE_URL}/")
+        response = SESSION.get(f"{BASE_URL}/")
         if response.status_code == 200:
             result = response.json()
             print("✅ Root endpoint working!")
@@ -0,0 +1,48 @@
+"""
+Shared fixtures for the unit tests (run with `python -m pytest` from the repository root)
+"""
+
+import random
+import time
+import pytest
+from datetime import datetime, timedelta
+from models import VitalSigns, RiskAssessment, PatientQueue
+
+RISK_LEVELS = ('Low', 'Medium', 'High', 'High Risk', 'Low Risk')
+
+def make_patient(rng: random.Random, patient_id: str) -> PatientQueue:
+    """Random queued patient, assessed up to 10 hours ago"""
+    vital_signs = VitalSigns(
+        heart_rate=rng.uniform(40, 140),
+        respiratory_rate=rng.uniform(8, 30),
+        body_temperature=rng.uniform(35, 40),
+        oxygen_saturation=rng.uniform(85, 100),
+        systolic_blood_pressure=rng.uniform(80, 190),
+        diastolic_blood_pressure=80.0,
+        age=rng.uniform(20, 90),
+        gender=1,
+        weight=70.0,
+        height=1.75,
+        derived_hrv=45.0,
+        derived_pulse_pressure=40.0,
+        derived_bmi=22.9,
+        derived_map=93.3
+    )
+    assessment = RiskAssessment(
+        risk_level=rng.choice(RISK_LEVELS),
+        vital_signs=vital_signs,
+        confidence_score=rng.uniform(0.3, 1.0),
+        timestamp=datetime.now() - timedelta(minutes=rng.uniform(0, 600))
+    )
+    return PatientQueue(patient_id=patient_id, risk_assessment=assessment,
+                        rl_adjustment=rng.choice([0.0, 10.0, 2.0, -3.0, -8.0]))
+
+@pytest.fixture
+def rng() -> random.Random:
+    return random.Random(1234)
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    """Stop the monotonic clock so scalar and columnar scores are taken at the same instant"""
+    now = time.monotonic_ns()
+    monkeypatch.setattr(time, "monotonic_ns", lambda: now)
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Tests for PredictionBatcher
+"""
+
+import asyncio
+import numpy as np
+import pytest
+from concurrent.futures import BrokenExecutor, Executor, Future, ThreadPoolExecutor
+from batching import PredictionBatcher
+
+def row_sums(features: np.ndarray):
+    return features.sum(axis=1).tolist()
+
+class BrokenPool(Executor):
+    """Executor that fails every submission like a process pool whose worker died"""
+    
+    def __init__(self):
+        self.shut_down = False
+    
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenExecutor("worker died"))
+        return future
+    
+    def shutdown(self, wait=True, **kwargs):
+        self.shut_down = True
+
+async def predict_all(batcher: PredictionBatcher, rows):
+    try:
+        return await asyncio.gather(*(batcher.predict(np.array(row, dtype=np.float64)) for row in rows))
+    finally:
+        await batcher.stop()
+
+def test_concurrent_requests_share_a_batch():
+    batch_sizes = []
+    
+    def predict_fn(features):
+        batch_sizes.append(len(features))
+        return row_sums(features)
+    
+    rows = [[i, 1.0] for i in range(10)]
+    results = asyncio.run(predict_all(PredictionBatcher(predict_fn), rows))
+    
+    assert results == [i + 1.0 for i in range(10)]
+    assert batch_sizes == [10]
+
+def test_batches_respect_max_batch():
+    batch_sizes = []
+    
+    def predict_fn(features):
+        batch_sizes.append(len(features))
+        return row_sums(features)
+    
+    rows = [[i, 0.0] for i in range(10)]
+    results = asyncio.run(predict_all(PredictionBatcher(predict_fn, max_batch=4), rows))
+    
+    assert results == [float(i) for i in range(10)]
+    assert max(batch_sizes) <= 4
+    assert sum(batch_sizes) == 10
+
+def test_errors_reach_every_request_in_the_batch():
+    def predict_fn(features):
+        raise ValueError("bad batch")
+    
+    async def run():
+        batcher = PredictionBatcher(predict_fn)
+        try:
+            return await asyncio.gather(
+                *(batcher.predict(np.zeros(2)) for _ in range(3)), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+    
+    results = asyncio.run(run())
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_broken_executor_is_replaced_and_batch_retried():
+    pools = [BrokenPool(), ThreadPoolExecutor(1)]
+    created = []
+    
+    def factory():
+        created.append(pools[len(created)])
+        return created[-1]
+    
+    batcher = PredictionBatcher(row_sums, executor_factory=factory)
+    try:
+        results = asyncio.run(predict_all(batcher, [[1.0, 2.0], [3.0, 4.0]]))
+    finally:
+        pools[1].shutdown()
+    
+    assert results == [3.0, 7.0]
+    assert created == pools
+    assert pools[0].shut_down
+    assert batcher.executor is pools[1]
+
+def test_batch_that_breaks_the_new_executor_fails():
+    batcher = PredictionBatcher(row_sums, executor_factory=BrokenPool)
+    with pytest.raises(BrokenExecutor):
+        asyncio.run(predict_all(batcher, [[1.0, 2.0]]))
+
+def test_broken_executor_without_factory_fails():
+    batcher = PredictionBatcher(row_sums, executor=BrokenPool())
+    with pytest.raises(BrokenExecutor):
+        asyncio.run(predict_all(batcher, [[1.0, 2.0]]))
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Tests for the in-memory QueueStore
+"""
+
+import pytest
+from conftest import make_patient
+from queue_store import QueueStore
+
+def reference_top(patients):
+    """Highest final priority by the scalar path (first on ties)"""
+    return max(patients, key=lambda p: p.get_final_priority())
+
+def assert_slots_consistent(store: QueueStore):
+    """Every slot's columns hold its own patient's priority inputs"""
+    assert len(store._slots) == len(store._slot_patients) == store.size()
+    for slot, patient in enumerate(store._slot_patients):
+        assessment = patient.risk_assessment
+        assert store._slots[patient.patient_id] == slot
+        assert store._columns['base_priority'][slot] == assessment.base_priority
+        assert store._columns['risk_idx'][slot] == assessment.risk_index
+        assert store._columns['enqueue_ns'][slot] == assessment.enqueue_ns
+
+def test_remove_swaps_last_slot_into_the_gap(rng):
+    store = QueueStore()
+    patients = [make_patient(rng, f"p{i}") for i in range(5)]
+    for patient in patients:
+        store.push(patient)
+    
+    assert store.remove("p1") is patients[1]
+    assert store.remove("p1") is None
+    assert store._slots["p4"] == 1
+    assert_slots_consistent(store)
+    
+    # Arrival order is kept even though slots moved
+    assert [p.patient_id for p in store.patients()] == ["p0", "p2", "p3", "p4"]
+
+def test_columns_grow_past_capacity(rng, frozen_clock):
+    store = QueueStore(capacity=2)
+    patients = [make_patient(rng, f"p{i}") for i in range(37)]
+    for patient in patients:
+        store.push(patient)
+    
+    assert len(store._columns['risk_idx']) >= 37
+    assert_slots_consistent(store)
+    priorities = store.priority_by_patient()
+    for patient in patients:
+        assert priorities[patient.patient_id] == pytest.approx(patient.get_final_priority(), rel=1e-12)
+
+def test_push_twice_keeps_one_entry(rng):
+    store = QueueStore()
+    patient = make_patient(rng, "p0")
+    store.push(patient)
+    store.push(patient)
+    assert store.size() == 1
+    assert store.pop() is patient
+    assert store.pop() is None
+
+def test_fuzz_against_reference_max(rng, frozen_clock):
+    store = QueueStore(capacity=4)
+    queued = {}
+    next_id = 0
+    for _ in range(2000):
+        op = rng.random()
+        if op < 0.5 or not queued:
+            patient = make_patient(rng, f"p{next_id}")
+            next_id += 1
+            store.push(patient)
+            queued[patient.patient_id] = patient
+        elif op < 0.8:
+            expected = reference_top(queued.values())
+            assert store.pop() is expected
+            del queued[expected.patient_id]
+        elif op < 0.9:
+            patient_id = rng.choice(list(queued))
+            assert store.remove(patient_id) is queued.pop(patient_id)
+        else:
+            # RL passes change low-risk patients' adjustments in place
+            for patient in queued.values():
+                patient.rl_adjustment = rng.choice([0.0, 10.0, 2.0, -3.0, -8.0])
+        
+        assert store.size() == len(queued)
+    
+    assert_slots_consistent(store)
+    while queued:
+        expected = reference_top(queued.values())
+        assert store.pop() is expected
+        del queued[expected.patient_id]
+    assert store.pop() is None
+
+def test_position_and_risk_counts_match_reference(rng, frozen_clock):
+    store = QueueStore()
+    patients = [make_patient(rng, f"p{i}") for i in range(200)]
+    for patient in patients:
+        store.push(patient)
+    
+    for priority in (0.0, 25.0, 80.0, 200.0, 1e9):
+        expected = sum(p.get_final_priority() > priority for p in patients)
+        assert store.position_for(priority) == expected
+    
+    counts = store.risk_counts()
+    for risk_idx in range(len(counts)):
+        assert counts[risk_idx] == sum(p.risk_assessment.risk_index == risk_idx for p in patients)
+
+def test_clear(rng):
+    store = QueueStore()
+    for i in range(3):
+        store.push(make_patient(rng, f"p{i}"))
+    store.clear()
+    assert store.size() == 0
+    assert store.patients() == []
+    assert store.pop() is None
\ No newline at end of file
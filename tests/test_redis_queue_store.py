@@ -0,0 +1,71 @@
+"""
+Tests for the Redis-backed queue store against an in-process fake Redis
+"""
+
+import asyncio
+import pytest
+from conftest import make_patient
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua scripting in fakeredis
+
+import redis_queue_store
+from redis_queue_store import RedisQueueStore
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(redis_queue_store.aioredis.Redis, "from_url",
+                        staticmethod(lambda url: fakeredis.FakeAsyncRedis()))
+    return RedisQueueStore("redis://test")
+
+def test_pop_order_matches_reference(store, rng):
+    async def run():
+        patients = {}
+        for i in range(100):
+            patient = make_patient(rng, f"p{i}")
+            patients[patient.patient_id] = patient
+            await store.push(patient)
+        
+        assert await store.size() == 100
+        assert list(await store.risk_counts()) == [
+            sum(p.risk_assessment.risk_index == risk_idx for p in patients.values()) for risk_idx in range(4)
+        ]
+        for priority in (0.0, 50.0, 200.0):
+            assert await store.position_for(priority) == sum(
+                p.get_final_priority() > priority for p in patients.values()
+            )
+        
+        while patients:
+            expected = max(patients.values(), key=lambda p: p.get_final_priority())
+            popped = await store.pop()
+            assert popped.patient_id == expected.patient_id
+            del patients[expected.patient_id]
+        assert await store.pop() is None
+    
+    asyncio.run(run())
+
+def test_rl_adjustments_are_written_back(store, rng):
+    async def run():
+        for i in range(3):
+            patient = make_patient(rng, f"p{i}")
+            patient.risk_assessment.risk_level = "Low"
+            patient.risk_assessment.refresh_cached_priority()
+            await store.push(patient)
+        
+        loaded = await store.patients()
+        for patient, boost in zip(loaded, (-8.0, 0.0, 1e6)):
+            patient.rl_adjustment = boost
+            patient.rl_action = "immediate"
+        
+        # A patient removed meanwhile (e.g. by another worker) is not written back
+        assert (await store.remove("p1")).patient_id == "p1"
+        await store.store_rl_adjustments(loaded)
+        
+        assert await store.size() == 2
+        assert await store.remove("p1") is None
+        assert sorted((p.patient_id, p.rl_action) for p in await store.patients()) == [
+            ("p0", "immediate"), ("p2", "immediate")
+        ]
+        assert (await store.pop()).patient_id == "p2"
+    
+    asyncio.run(run())
\ No newline at end of file
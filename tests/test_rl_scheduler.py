@@ -0,0 +1,121 @@
+"""
+Tests for Q-value persistence and store selection in the RL scheduler
+"""
+
+import json
+import numpy as np
+import pytest
+from rl_scheduler import PatientSchedulerRL, PriorityManager, QTable, QVStore, LinearQFunction
+
+N_ACTIONS = 5
+
+def state(i: int):
+    return ('low', i % 11, i % 7, i % 5, ('morning', 'afternoon', 'evening')[i % 3])
+
+def fill(table: QTable, states, rng: np.random.Generator):
+    """Give each state random float16-representable Q-values"""
+    for s in states:
+        table.q_values(s)[:] = rng.uniform(-10, 10, N_ACTIONS).astype(np.float16)
+
+def assert_same_rows(a: QTable, b: QTable):
+    states_a, values_a = a.rows()
+    states_b, values_b = b.rows()
+    assert states_a == states_b
+    np.testing.assert_array_equal(values_a, values_b)
+
+def test_qtable_incremental_save_round_trips(tmp_path):
+    path = str(tmp_path / "q_table")
+    rng = np.random.default_rng(0)
+    table = QTable(N_ACTIONS, capacity=4)
+    fill(table, [state(i) for i in range(10)], rng)
+    table._dirty.update(range(10))
+    table.save(path)
+    
+    # New states and in-place updates of a few old rows, written incrementally
+    for i in range(10, 25):
+        table.q_values(state(i))
+    table.update(state(3), 1, 5.0, state(20), 0.5, 0.9)
+    table.update(state(21), 4, -2.0, state(0), 0.5, 0.9)
+    assert table._dirty == {table._index[state(3)], table._index[state(21)]}
+    table.save(path)
+    assert not table._dirty
+    
+    loaded = QTable(N_ACTIONS)
+    assert loaded.load(path)
+    assert_same_rows(table, loaded)
+    
+    # Loaded in step with the files: the next save only writes changes
+    assert not loaded._dirty
+    assert loaded._saved_states == 25
+
+def test_qtable_recovers_from_files_out_of_step(tmp_path):
+    path = str(tmp_path / "q_table")
+    table = QTable(N_ACTIONS)
+    fill(table, [state(i) for i in range(6)], np.random.default_rng(1))
+    table._dirty.update(range(6))
+    table.save(path)
+    
+    # A save interrupted after logging new state keys but before sizing the row file
+    with open(path + '.states', 'a') as f:
+        f.write('low|9|9|4|evening\n')
+    
+    loaded = QTable(N_ACTIONS)
+    assert loaded.load(path)
+    assert_same_rows(table, loaded)
+    
+    # Out of step: everything is rewritten on the next save, which repairs the files
+    assert loaded._saved_states == 0
+    loaded.save(path)
+    reloaded = QTable(N_ACTIONS)
+    assert reloaded.load(path)
+    assert_same_rows(table, reloaded)
+    assert reloaded._saved_states == 6
+
+def test_qtable_reads_float32_rows(tmp_path):
+    path = str(tmp_path / "q_table")
+    states = [state(i) for i in range(3)]
+    values = np.arange(3 * N_ACTIONS, dtype=np.float32).reshape(3, N_ACTIONS)
+    with open(path + '.states', 'w') as f:
+        f.writelines('|'.join(map(str, s)) + '\n' for s in states)
+    values.tofile(path + '.bin')
+    
+    table = QTable(N_ACTIONS)
+    assert table.load(path)
+    loaded_states, loaded_values = table.rows()
+    assert loaded_states == states
+    np.testing.assert_array_equal(loaded_values, values)
+
+@pytest.mark.parametrize("legacy_format", ["dict", "list"])
+def test_legacy_json_import(tmp_path, legacy_format):
+    path = str(tmp_path / "q_table")
+    actions = ('immediate', 'delay_15', 'delay_30', 'delay_60', 'delay_120')
+    saved = {
+        'low_5_3_1_morning': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'medium|7|10|0|evening': [0.5, 0.0, -1.0, 0.0, 2.0],
+    }
+    if legacy_format == "dict":
+        saved = {key: dict(zip(actions, values)) for key, values in saved.items()}
+    with open(path + '.json', 'w') as f:
+        json.dump(saved, f)
+    
+    scheduler = PatientSchedulerRL(q_table=QTable(N_ACTIONS))
+    scheduler.load_q_table(path)
+    np.testing.assert_array_equal(scheduler.get_q_values(('low', 5, 3, 1, 'morning')), [1, 2, 3, 4, 5])
+    np.testing.assert_array_equal(scheduler.get_q_values(('medium', 7, 10, 0, 'evening')), [0.5, 0, -1, 0, 2])
+
+@pytest.mark.parametrize("q_store, store_type", [
+    ('linear', LinearQFunction), ('hashed', QVStore), ('table', QTable)
+])
+def test_priority_manager_q_store(q_store, store_type):
+    assert isinstance(PriorityManager(q_store=q_store).rl_scheduler.q_table, store_type)
+
+def test_priority_manager_rejects_unknown_q_store():
+    with pytest.raises(ValueError):
+        PriorityManager(q_store='unknown')
+
+def test_seeded_exploration_is_reproducible():
+    def draws(seed):
+        scheduler = PatientSchedulerRL(epsilon=0.5, q_table=QTable(N_ACTIONS), seed=seed)
+        return [scheduler.choose_action(state(i)) for i in range(50)]
+    
+    assert draws(7) == draws(7)
\ No newline at end of file
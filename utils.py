@@ -1,20 +1,39 @@
+import joblib
+import os
+import tempfile
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from functools import lru_cache
 from typing import Tuple, List
 from models import VitalSigns, RiskAssessment, PatientQueue
+from rl_scheduler import PriorityManager
 
-def scale_data(data, scaler):
+# Wait time lookup tables indexed by risk level index (see models.RISK_LEVEL_INDEX):
+# minutes per patient ahead in the queue (20 for unrecognized labels), and the
+# urgency adjustment that shortens high-risk waits
+WAIT_PER_PATIENT = (25, 20, 15, 20)
+WAIT_URGENCY = (0, 0, -10, 0)
+_WAIT_PER_PATIENT = np.array(WAIT_PER_PATIENT, dtype=np.int32)
+_WAIT_URGENCY = np.array(WAIT_URGENCY, dtype=np.int32)
+
+def scale_data(data, scaler, copy=True):
     """
     Scale the input data using the provided scaler.
     Args:
         data (list or np.ndarray or pd.DataFrame): Input features.
         scaler: Fitted scaler object.
+        copy (bool): If False, a float np.ndarray input is scaled in place.
     Returns:
         np.ndarray: Scaled data.
     """
-    df = pd.DataFrame([data]) if not isinstance(data, (pd.DataFrame, np.ndarray)) else data
-    return scaler.transform(df)
+    if isinstance(data, pd.DataFrame):
+        return scaler.transform(data, copy=copy)
+    # A plain array skips DataFrame construction for single rows (lists are converted)
+    data = np.asarray(data, dtype=np.float64) if not isinstance(data, np.ndarray) else data
+    if data.ndim == 1:
+        data = data.reshape(1, -1)
+    return scaler.transform(data, copy=copy)
 
 def encode_labels(labels, label_encoder):
     """
@@ -40,17 +59,18 @@ def predict_risk_with_confidence(features, scaler, model, label_encoder):
     """
     scaled = scale_data(features, scaler)
     
-    # Get prediction probabilities for confidence
+    # Get prediction probabilities for confidence; the predicted class is the most
+    # probable one, so the model is not run a second time through predict()
     if hasattr(model, 'predict_proba'):
         probabilities = model.predict_proba(scaled)
-        confidence_score = float(np.max(probabilities[0]))
+        idx = int(np.argmax(probabilities[0]))
+        confidence_score = float(probabilities[0, idx])
     else:
-        # For models without predict_proba, use distance from decision boundary
-        prediction = model.predict(scaled)
+        idx = int(model.predict(scaled)[0])
         confidence_score = 0.8  # Default confidence
     
-    pred_encoded = model.predict(scaled)
-    pred_label = label_encoder.inverse_transform(pred_encoded)[0]
+    # Index the classes directly rather than through inverse_transform's validation
+    pred_label = label_encoder.classes_[idx]
     
     return pred_label, confidence_score
 
@@ -68,22 +88,139 @@ def predict_risk(features, scaler, model, label_encoder):
     pred_label, _ = predict_risk_with_confidence(features, scaler, model, label_encoder)
     return pred_label
 
-def create_risk_assessment_with_priority(vital_signs_data: dict, scaler, model, label_encoder) -> RiskAssessment:
+def predict_batch_with_confidence(features: np.ndarray, scaler, model, label_encoder,
+                                  copy=True) -> List[Tuple[str, float]]:
     """
-    Create a RiskAssessment with priority scoring
+    Predict risk labels and confidence scores for a batch of samples in one model call.
     Args:
-        vital_signs_data: Dictionary containing vital signs data
-        scaler: Fitted scaler object
-        model: Trained model object
-        label_encoder: Fitted label encoder object
+        features (np.ndarray): 2-D array with one row of input features per sample.
+        scaler: Fitted scaler object.
+        model: Trained model object.
+        label_encoder: Fitted label encoder object.
+        copy (bool): If False, features is scaled in place instead of copied.
     Returns:
-        RiskAssessment: Complete risk assessment with priority score
+        list: (predicted_risk_label, confidence_score) for each row
+    """
+    scaled = scale_data(features, scaler, copy=copy)
+    
+    if hasattr(model, 'predict_proba'):
+        probabilities = model.predict_proba(scaled)
+        pred_encoded = probabilities.argmax(axis=1)
+        confidence_scores = probabilities[np.arange(len(pred_encoded)), pred_encoded].tolist()
+    else:
+        pred_encoded = model.predict(scaled)
+        confidence_scores = [0.8] * len(scaled)  # Default confidence
+    
+    pred_labels = label_encoder.classes_[pred_encoded].tolist()
+    
+    return list(zip(pred_labels, confidence_scores))
+
+class CompiledModel:
+    """
+    Tree ensemble compiled to a native shared library with Treelite/TL2cgen.
+    Exposes the predict_proba/predict subset of the scikit-learn API used here.
+    """
+    
+    def __init__(self, libpath: str, nthread: int = 1):
+        import tl2cgen
+        
+        self._predictor = tl2cgen.Predictor(libpath, nthread=nthread)
+        self._dmatrix = tl2cgen.DMatrix
+    
+    def predict_proba(self, features) -> np.ndarray:
+        output = self._predictor.predict(self._dmatrix(np.asarray(features, dtype=np.float32)))
+        probabilities = output.reshape(len(features), -1)
+        if probabilities.shape[1] == 1:
+            # Binary objective: the library returns P(class 1) only
+            probabilities = np.hstack([1.0 - probabilities, probabilities])
+        return probabilities
+    
+    def predict(self, features) -> np.ndarray:
+        return self.predict_proba(features).argmax(axis=1)
+
+def is_model_library_current(model_path: str, libpath: str) -> bool:
+    """Whether a compiled model library exists at libpath and is newer than the model pickle"""
+    return os.path.exists(libpath) and os.path.getmtime(libpath) >= os.path.getmtime(model_path)
+
+def compile_model_library(model, model_path: str, libpath: str):
+    """
+    Compile an XGBoost model to a native shared library, reusing an up-to-date one
+    Args:
+        model: Trained XGBoost model (sklearn wrapper)
+        model_path: Path the model was loaded from (a newer pickle triggers recompilation)
+        libpath: Path of the shared library to create
+    Returns:
+        str or None: libpath, or None if Treelite is unavailable or compilation failed
     """
-    # Create VitalSigns object
-    vital_signs = VitalSigns(**vital_signs_data)
+    try:
+        import treelite
+        import tl2cgen
+    except ImportError:
+        return None
+    
+    if is_model_library_current(model_path, libpath):
+        return libpath
     
-    # Prepare features for prediction
-    features = [
+    # Export to a temporary file and rename it into place, so a process loading
+    # libpath never sees a partly written library
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(libpath)),
+                                    suffix=os.path.splitext(libpath)[1])
+    os.close(fd)
+    try:
+        tl_model = treelite.frontend.from_xgboost(model.get_booster())
+        tl2cgen.export_lib(tl_model, toolchain='gcc', libpath=tmp_path, params={'parallel_comp': 4})
+        os.replace(tmp_path, libpath)
+    except Exception as e:
+        print(f"Error compiling model library: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    
+    return libpath
+
+# Scaler, model and label encoder of an inference worker process
+_worker_models: Tuple = ()
+
+def init_prediction_worker(scaler_path: str, model_path: str, label_encoder_path: str, model_lib_path: str = None):
+    """
+    Load the fitted scaler, model and label encoder into an inference worker process
+    Args:
+        scaler_path: Path to the pickled scaler
+        model_path: Path to the pickled model
+        label_encoder_path: Path to the pickled label encoder
+        model_lib_path: Compiled model library to predict with instead of the pickled model
+    """
+    global _worker_models
+    if model_lib_path:
+        model = CompiledModel(model_lib_path)
+    else:
+        model = joblib.load(model_path)
+        if hasattr(model, 'n_jobs'):
+            # Parallelism comes from running one worker process per core
+            model.set_params(n_jobs=1)
+    _worker_models = (joblib.load(scaler_path), model, joblib.load(label_encoder_path))
+
+def predict_batch_in_worker(features: np.ndarray) -> List[Tuple[str, float]]:
+    """
+    Predict a batch with the models loaded by init_prediction_worker
+    Args:
+        features (np.ndarray): 2-D array with one row of input features per sample.
+    Returns:
+        list: (predicted_risk_label, confidence_score) for each row
+    """
+    scaler, model, label_encoder = _worker_models
+    # The batch was unpickled into a fresh array owned by this worker, so scale it in place
+    return predict_batch_with_confidence(features, scaler, model, label_encoder, copy=False)
+
+def vital_signs_features(vital_signs: VitalSigns) -> np.ndarray:
+    """
+    Build the model feature row for the given vital signs
+    Args:
+        vital_signs: VitalSigns object
+    Returns:
+        np.ndarray: Features in the order the scaler and model were trained on
+    """
+    return np.array((
         vital_signs.heart_rate,
         vital_signs.respiratory_rate,
         vital_signs.body_temperature,
@@ -98,11 +235,59 @@ def create_risk_assessment_with_priority(vital_signs_data: dict, scaler, model,
         vital_signs.derived_pulse_pressure,
         vital_signs.derived_bmi,
         vital_signs.derived_map
-    ]
-    
+    ), dtype=np.float32)
+
+def quantized_vitals_key(vital_signs: VitalSigns) -> tuple:
+    """
+    Coarsen vital signs into a cache key so near-identical readings share a prediction
+    Args:
+        vital_signs: VitalSigns object
+    Returns:
+        tuple: Rounded heart rate, respiratory rate, temperature (0.1 deg), SpO2,
+        blood pressure (2 mmHg), age (5 years), gender and BMI (0.5)
+    """
+    return (
+        round(vital_signs.heart_rate),
+        round(vital_signs.respiratory_rate),
+        round(vital_signs.body_temperature * 10),
+        round(vital_signs.oxygen_saturation),
+        round(vital_signs.systolic_blood_pressure / 2) * 2,
+        round(vital_signs.diastolic_blood_pressure / 2) * 2,
+        round(vital_signs.age / 5) * 5,
+        vital_signs.gender,
+        round(vital_signs.derived_bmi * 2) / 2
+    )
+
+def create_risk_assessment_with_priority(vital_signs: VitalSigns, scaler, model, label_encoder,
+                                         features: np.ndarray = None) -> RiskAssessment:
+    """
+    Create a RiskAssessment with priority scoring
+    Args:
+        vital_signs: VitalSigns object
+        scaler: Fitted scaler object
+        model: Trained model object
+        label_encoder: Fitted label encoder object
+        features: Feature row for vital_signs, built from it when omitted
+    Returns:
+        RiskAssessment: Complete risk assessment with priority score
+    """
     # Get prediction with confidence
+    if features is None:
+        features = vital_signs_features(vital_signs)
     risk_level, confidence_score = predict_risk_with_confidence(features, scaler, model, label_encoder)
     
+    return build_risk_assessment(vital_signs, risk_level, confidence_score)
+
+def build_risk_assessment(vital_signs: VitalSigns, risk_level: str, confidence_score: float) -> RiskAssessment:
+    """
+    Create a RiskAssessment with priority scoring from an existing prediction
+    Args:
+        vital_signs: VitalSigns object the prediction was made for
+        risk_level: Predicted risk label
+        confidence_score: Model confidence in the prediction
+    Returns:
+        RiskAssessment: Complete risk assessment with priority score
+    """
     # Create risk assessment
     risk_assessment = RiskAssessment(
         risk_level=risk_level,
@@ -124,10 +309,7 @@ def manage_patient_queue(patient_assessments: List[RiskAssessment]) -> List[Pati
     Returns:
         List[PatientQueue]: Sorted patient queue by priority
     """
-    from rl_scheduler import PriorityManager
-    
     patient_queue = []
-    priority_manager = PriorityManager()
     
     for i, assessment in enumerate(patient_assessments):
         patient_id = f"patient_{i+1}_{int(assessment.timestamp.timestamp())}"
@@ -139,13 +321,37 @@ def manage_patient_queue(patient_assessments: List[RiskAssessment]) -> List[Pati
         
         patient_queue.append(queue_item)
     
+    return rank_patient_queue(patient_queue)
+
+@lru_cache(maxsize=1)
+def get_priority_manager() -> PriorityManager:
+    """
+    Shared RL priority manager, created (and its Q-table loaded) on first use
+    The Q-value store is chosen with the RL_Q_STORE environment variable
+    (linear, hashed or table; default linear).
+    Returns:
+        PriorityManager: The process-wide instance
+    """
+    return PriorityManager(q_store=os.environ.get("RL_Q_STORE", "linear"))
+
+def rank_patient_queue(patient_queue: List[PatientQueue]) -> List[PatientQueue]:
+    """
+    Sort existing queue items by priority with RL integration
+    Args:
+        patient_queue: List of PatientQueue objects in arrival order
+    Returns:
+        List[PatientQueue]: Sorted patient queue by priority
+    """
+    priority_manager = get_priority_manager()
+    
     # Use RL-enhanced priority management
     sorted_queue = priority_manager.calculate_dynamic_priority(patient_queue)
     
     # Update queue positions and estimated wait times
-    for i, patient in enumerate(sorted_queue):
+    wait_times = estimated_wait_times(sorted_queue).tolist()
+    for i, (patient, wait_time) in enumerate(zip(sorted_queue, wait_times)):
         patient.queue_position = i + 1
-        patient.estimated_wait_time = calculate_estimated_wait_time(patient, i)
+        patient.estimated_wait_time = wait_time
     
     return sorted_queue
 
@@ -158,20 +364,17 @@ def calculate_estimated_wait_time(patient: PatientQueue, position: int) -> int:
     Returns:
         int: Estimated wait time in minutes
     """
-    base_time_per_patient = {
-        "high": 15,    # 15 minutes per high-risk patient
-        "medium": 20,  # 20 minutes per medium-risk patient
-        "low": 25      # 25 minutes per low-risk patient
-    }
-    
-    risk_level = patient.risk_assessment.risk_level.lower()
-    base_time = base_time_per_patient.get(risk_level, 20)
-    
-    # Calculate wait time based on position
-    estimated_wait = position * base_time
-    
-    # Apply urgency factor for high-risk patients
-    if risk_level == "high":
-        estimated_wait = max(0, estimated_wait - 10)  # Reduce wait time for high-risk
-    
-    return estimated_wait
\ No newline at end of file
+    risk_idx = patient.risk_assessment.risk_index
+    return max(0, position * WAIT_PER_PATIENT[risk_idx] + WAIT_URGENCY[risk_idx])
+
+def estimated_wait_times(sorted_queue: List[PatientQueue]) -> np.ndarray:
+    """
+    Vectorized calculate_estimated_wait_time for a whole sorted queue
+    Args:
+        sorted_queue: PatientQueue objects in queue order (position = list index)
+    Returns:
+        np.ndarray: Estimated wait time in minutes per patient
+    """
+    risk_idx = np.fromiter((p.risk_assessment.risk_index for p in sorted_queue), dtype=np.int8, count=len(sorted_queue))
+    positions = np.arange(len(sorted_queue), dtype=np.int32)
+    return np.maximum(0, positions * _WAIT_PER_PATIENT[risk_idx] + _WAIT_URGENCY[risk_idx])
\ No newline at end of file